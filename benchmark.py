@@ -0,0 +1,121 @@
+# Compiles the benchmark suite with every compiler variant, simulates each
+# result under one seeded noise model and records timings, circuit size and
+# fidelity to JSON and CSV, so compiler quality and speed can be tracked
+# between versions.
+
+import argparse
+import csv
+import json
+import time
+
+from circuits.suite import ALGORITHMS, benchmark_suite
+from compilers.batch_compile import calibration_tables, compile_circuit
+from density_matrix_simulator import density_matrix_simulator
+from evaluation import fidelity_metrics, to_logical
+from fidelity_measurement import fidelity_classifier
+from simulating_noise import noise_parameters
+
+
+# Variant name -> (placement strategy, run gate cancellation)
+VARIANTS = {
+    "identity": ("identity", False),
+    "greedy_v": ("greedy_v", False),
+    "reorder_overall": ("reorder_overall", False),
+    "greedy_swap": ("greedy_swap", False),
+    "gate_cancellation": ("identity", True),
+}
+
+FIELDS = [
+    "algorithm", "width", "qubits", "variant", "strategy", "cancel",
+    "compile_time", "simulation_time", "gate_count", "depth",
+    "hellinger", "total_variation", "normalized_overlap",
+]
+
+
+def run_benchmark(widths, variants=None, algorithms=None, num_qubits=11, seed=0, noise=None):
+    """
+    noise is a noise_parameters to use instead of sampling one from seed.
+    Return value: list of records, one per (algorithm, width, variant),
+    each with the keys in FIELDS
+    """
+    if noise is None:
+        noise = noise_parameters.sample(num_qubits, seed)
+    nm = noise.to_noise_model()
+    classifier = fidelity_classifier(noise.num_qubits, None, nm)
+    tables = calibration_tables(
+        classifier.analytic_single_qubit_fidelity(),
+        classifier.analytic_two_qubit_fidelity(),
+    )
+    ideal_simulator = density_matrix_simulator()
+    noisy_simulator = density_matrix_simulator(nm)
+
+    records = []
+    for name, width, circuit in benchmark_suite(widths, algorithms):
+        ideal, logical = ideal_simulator.probabilities(circuit)
+        for variant in variants or VARIANTS:
+            strategy, cancel = VARIANTS[variant]
+            start = time.perf_counter()
+            compiled, vertex_map, _ = compile_circuit(circuit, tables, strategy, cancel)
+            compile_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            probs, physical = noisy_simulator.probabilities(compiled)
+            simulation_time = time.perf_counter() - start
+
+            probs = to_logical(probs, physical, vertex_map, logical)
+            record = {
+                "algorithm": name,
+                "width": width,
+                # builders may use fewer qubits than the width they were given
+                "qubits": circuit.qubit_count,
+                "variant": variant,
+                "strategy": strategy,
+                "cancel": cancel,
+                "compile_time": compile_time,
+                "simulation_time": simulation_time,
+                "gate_count": len(compiled.instructions),
+                "depth": compiled.depth,
+            }
+            record.update(fidelity_metrics(ideal, probs))
+            records.append(record)
+    return records
+
+
+def write_json(records, path):
+    with open(path, "w") as f:
+        json.dump(records, f, indent=2)
+
+
+def write_csv(records, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiler benchmark suite")
+    parser.add_argument("--widths", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS))
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", help="noise_parameters .npz to load instead of sampling")
+    parser.add_argument("--json", default="benchmark.json")
+    parser.add_argument("--csv", default="benchmark.csv")
+    args = parser.parse_args()
+
+    noise = noise_parameters.load(args.noise) if args.noise else None
+    records = run_benchmark(args.widths, args.variants, args.algorithms, seed=args.seed, noise=noise)
+    write_json(records, args.json)
+    write_csv(records, args.csv)
+    for r in records:
+        print(
+            f"{r['algorithm']:>20} n={r['width']:<3} {r['variant']:>18}: "
+            f"compile {r['compile_time'] * 1e3:7.2f} ms, "
+            f"simulate {r['simulation_time'] * 1e3:8.2f} ms, "
+            f"{r['gate_count']:4d} gates, overlap {r['normalized_overlap']:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
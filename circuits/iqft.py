@@ -1,25 +1,18 @@
-# Use Braket SDK Cost Tracking to estimate the cost to run this example
-from braket.tracking import Tracker
-t = Tracker().start()
-
-from braket.aws import AwsDevice
-from braket.circuits import Circuit, gates, noises, observables
-from braket.devices import LocalSimulator
-from braket.parametric import FreeParameter
+from braket.circuits import Circuit
 import numpy as np
-from scipy.stats import unitary_group
 import math
 
-def iqft(n):
+def iqft(n, max_degree=None):
+    if max_degree is None:
+        max_degree = n
     circuit = Circuit()
     
     for i in range(0, n):
         circuit.h(i)
-        for j in range(1, n - i):
+        for j in range(1, min(n - i, max_degree + 1)):
             circuit.cphaseshift(i+j,i,(-2 * np.pi / math.pow(2,j)))
 
     return circuit
 
-qft = iqft(4)
-
-print(qft)
+if __name__ == "__main__":
+    print(iqft(4))
@@ -1,16 +1,15 @@
-# Use Braket SDK Cost Tracking to estimate the cost to run this example
-from braket.tracking import Tracker
-t = Tracker().start()
-
-from braket.aws import AwsDevice
-from braket.circuits import Circuit, gates, noises, observables
-from braket.devices import LocalSimulator
-from braket.parametric import FreeParameter
+from braket.circuits import Circuit
 import numpy as np
-from scipy.stats import unitary_group
 import math
 
-def qft(n, arr):
+def qft(n, arr, max_degree=None):
+    """
+    QFT on n qubits after X on every set bit of arr. With max_degree set,
+    controlled rotations by 2*pi/2^j for j > max_degree are left out
+    (the approximate QFT).
+    """
+    if max_degree is None:
+        max_degree = n
     circuit = Circuit()
     
     for i in range(len(arr)):
@@ -19,7 +18,51 @@ def qft(n, arr):
     
     for i in range(0, n):
         circuit.h(i)
-        for j in range(1, n - i):
+        for j in range(1, min(n - i, max_degree + 1)):
             circuit.cphaseshift(i+j,i,(2 * np.pi / math.pow(2,j)))
 
     return circuit
+
+
+def rotation_count(n, max_degree=None):
+    """
+    Number of controlled rotations in qft(n, arr, max_degree)
+    """
+    if max_degree is None:
+        max_degree = n
+    return sum(min(n - i - 1, max_degree) for i in range(n))
+
+
+def pruned_rotations(n, max_degree):
+    """
+    Number of controlled rotations the approximate QFT saves
+    """
+    return rotation_count(n) - rotation_count(n, max_degree)
+
+
+def degree_for_angle(min_angle):
+    """
+    Largest degree j whose rotation 2*pi/2^j is at least min_angle
+    """
+    if min_angle <= 0:
+        raise ValueError(f"min_angle must be positive, got {min_angle}")
+    return max(0, int(math.floor(math.log2(2 * np.pi / min_angle))))
+
+
+def degree_for_fidelity(two_qubit_fidelity):
+    """
+    Largest degree whose rotation is worth its gate: leaving out a controlled
+    rotation by theta has process infidelity 3 * (1 - cos(theta)) / 8, and a
+    CPhaseShift costs two native gates of the mean measured two qubit
+    fidelity F, so 1 - F^2. Rotations that do less than that are pruned.
+    Returns None (keep every rotation) for noiseless gates.
+    """
+    f = np.asarray(two_qubit_fidelity, dtype=float)
+    off_diagonal = f[~np.eye(len(f), dtype=bool)]
+    gate_error = 1 - off_diagonal.mean() ** 2
+    if gate_error <= 0:
+        return None
+    degree = 0
+    while 3 * (1 - math.cos(2 * np.pi / math.pow(2, degree + 1))) / 8 >= gate_error:
+        degree += 1
+    return degree
@@ -0,0 +1,327 @@
+from braket.circuits import Circuit
+import numpy as np
+import math
+
+from circuits.iqft import iqft
+from circuits.qft import qft
+from compilers.instruction_rewrite import random_circuit
+
+
+def bernstein_vazirani(n, secret=None):
+    """
+    n-1 input qubits and an ancilla on qubit n-1. secret defaults to
+    alternating bits.
+    """
+    m = n - 1
+    if secret is None:
+        secret = [i % 2 for i in range(m)]
+    circuit = Circuit()
+    circuit.x(m)
+    circuit.h(m)
+    for i in range(m):
+        circuit.h(i)
+    for i in range(m):
+        if secret[i] == 1:
+            circuit.cnot(i, m)
+    for i in range(m):
+        circuit.h(i)
+    return circuit
+
+
+def deutsch_jozsa(n):
+    """
+    Balanced oracle: the parity of the n-1 inputs, with every other input
+    flipped.
+    """
+    m = n - 1
+    circuit = Circuit()
+    circuit.x(m)
+    circuit.h(m)
+    for i in range(m):
+        circuit.h(i)
+    for i in range(0, m, 2):
+        circuit.x(i)
+    for i in range(m):
+        circuit.cnot(i, m)
+    for i in range(0, m, 2):
+        circuit.x(i)
+    for i in range(m):
+        circuit.h(i)
+    return circuit
+
+
+def ghz(n):
+    circuit = Circuit()
+    circuit.h(0)
+    for i in range(1, n):
+        circuit.cnot(i - 1, i)
+    return circuit
+
+
+def _fourier_phases(bits):
+    """
+    qft(n, bits) leaves qubit i in (|0> + e^(i*phi_i)|1>)/sqrt(2); returns
+    the phi_i
+    """
+    n = len(bits)
+    return [
+        np.pi * bits[i] + sum(2 * np.pi * bits[i + j] / math.pow(2, j) for j in range(1, n - i))
+        for i in range(n)
+    ]
+
+
+def _undo_fourier_phases(circuit, phases):
+    # takes each qubit from (|0> + e^(i*phi)|1>)/sqrt(2) back to |0>
+    for i, phi in enumerate(phases):
+        circuit.phaseshift(i, -phi)
+        circuit.h(i)
+    return circuit
+
+
+def _input_bits(n):
+    return [(i + 1) % 2 for i in range(n)]
+
+
+def qft_benchmark(n):
+    """
+    qft on an alternating input, then single qubit gates that undo the
+    expected output phases. The ideal output is all zeros, so an error in
+    any of the controlled rotations shows up in the distribution.
+    """
+    bits = _input_bits(n)
+    return _undo_fourier_phases(qft(n, bits), _fourier_phases(bits))
+
+
+def iqft_benchmark(n):
+    """
+    iqft is qft with the angles negated, so it sends the alternating input
+    to the conjugate phases; undoing them gives all zeros ideally.
+    """
+    bits = _input_bits(n)
+    circuit = Circuit()
+    for i in range(n):
+        if bits[i] == 1:
+            circuit.x(i)
+    circuit.add_circuit(iqft(n))
+    return _undo_fourier_phases(circuit, [-phi for phi in _fourier_phases(bits)])
+
+
+def inverse_qft(circuit, qubits):
+    """
+    Appends the exact inverse QFT on qubits, first qubit most significant:
+    the swaps, then the conjugated rotations in reverse order
+    """
+    m = len(qubits)
+    for j in range(m // 2):
+        circuit.swap(qubits[j], qubits[m - 1 - j])
+    for j in reversed(range(m)):
+        for k in reversed(range(j + 1, m)):
+            circuit.cphaseshift(qubits[k], qubits[j], -2 * np.pi / math.pow(2, k - j + 1))
+        circuit.h(qubits[j])
+    return circuit
+
+
+def phase_estimation(n, phase=1 / 3):
+    """
+    Estimates phase of a PhaseShift(2*pi*phase) on qubit n-1 with n-1
+    counting qubits, first counting qubit most significant. The ideal
+    output peaks on round(2^(n-1) * phase).
+    """
+    m = n - 1
+    circuit = Circuit()
+    circuit.x(m)
+    for k in range(m):
+        circuit.h(k)
+        circuit.cphaseshift(k, m, 2 * np.pi * phase * math.pow(2, m - 1 - k))
+    return inverse_qft(circuit, list(range(m)))
+
+
+def _mcz(circuit, controls, target, ancillas):
+    """
+    Z on target controlled on every qubit in controls, through a chain of
+    CCNots onto len(controls)-1 ancillas.
+    """
+    if len(controls) == 1:
+        circuit.cz(controls[0], target)
+        return
+    chain = [(controls[0], controls[1], ancillas[0])]
+    for i in range(2, len(controls)):
+        chain.append((controls[i], ancillas[i - 2], ancillas[i - 1]))
+    for a, b, c in chain:
+        circuit.ccnot(a, b, c)
+    circuit.cz(chain[-1][2], target)
+    for a, b, c in reversed(chain):
+        circuit.ccnot(a, b, c)
+
+
+def grover(n):
+    """
+    Searches (n+2)//2 data qubits for the all ones state, with the rest of
+    the qubits as ancillas for the multi-controlled Z.
+    """
+    m = (n + 2) // 2
+    data = list(range(m))
+    ancillas = list(range(m, n))
+    circuit = Circuit()
+    for q in data:
+        circuit.h(q)
+    # rounding up over-rotates: at m = 2 two iterations give a uniform output
+    for _ in range(max(1, math.floor(math.pi / 4 * math.sqrt(2**m)))):
+        _mcz(circuit, data[:-1], data[-1], ancillas)
+        for q in data:
+            circuit.h(q)
+            circuit.x(q)
+        _mcz(circuit, data[:-1], data[-1], ancillas)
+        for q in data:
+            circuit.x(q)
+            circuit.h(q)
+    return circuit
+
+
+def w_state(n):
+    circuit = Circuit()
+    circuit.x(0)
+    for i in range(n - 1):
+        # controlled Ry(theta) from i onto i+1, then move the excitation
+        theta = 2 * math.acos(math.sqrt(1 / (n - i)))
+        circuit.ry(i + 1, theta / 2)
+        circuit.cnot(i, i + 1)
+        circuit.ry(i + 1, -theta / 2)
+        circuit.cnot(i, i + 1)
+        circuit.cnot(i + 1, i)
+    return circuit
+
+
+def ripple_adder(n):
+    """
+    Cuccaro ripple-carry adder of two (n-2)//2 bit registers: carry in on
+    qubit 0, b_i on 1+2i, a_i on 2+2i and the carry out on the last qubit.
+    a is all ones and b alternates.
+    """
+    m = (n - 2) // 2
+    b = [1 + 2 * i for i in range(m)]
+    a = [2 + 2 * i for i in range(m)]
+    z = 2 * m + 1
+    circuit = Circuit()
+    for i in range(m):
+        circuit.x(a[i])
+        if i % 2 == 0:
+            circuit.x(b[i])
+
+    carries = [0] + a[:-1]
+    for c, bi, ai in zip(carries, b, a):
+        circuit.cnot(ai, bi)
+        circuit.cnot(ai, c)
+        circuit.ccnot(c, bi, ai)
+    circuit.cnot(a[-1], z)
+    for c, bi, ai in reversed(list(zip(carries, b, a))):
+        circuit.ccnot(c, bi, ai)
+        circuit.cnot(ai, c)
+        circuit.cnot(c, bi)
+    return circuit
+
+
+def hidden_shift(n):
+    """
+    Hidden shift of the inner product bent function on the largest even
+    number of qubits <= n. The shift alternates bits.
+    """
+    m = n - n % 2
+    shift = [i % 2 for i in range(m)]
+    circuit = Circuit()
+    for i in range(m):
+        circuit.h(i)
+    for i in range(m):
+        if shift[i] == 1:
+            circuit.x(i)
+    for i in range(0, m, 2):
+        circuit.cz(i, i + 1)
+    for i in range(m):
+        if shift[i] == 1:
+            circuit.x(i)
+    for i in range(m):
+        circuit.h(i)
+    for i in range(0, m, 2):
+        circuit.cz(i, i + 1)
+    for i in range(m):
+        circuit.h(i)
+    return circuit
+
+
+def qaoa_maxcut(n, gamma=0.8, beta=0.4):
+    """
+    One QAOA layer for MaxCut on the ring of n qubits
+    """
+    edges = [(i, (i + 1) % n) for i in range(n if n > 2 else 1)]
+    circuit = Circuit()
+    for i in range(n):
+        circuit.h(i)
+    for i, j in edges:
+        circuit.zz(i, j, 2 * gamma)
+    for i in range(n):
+        circuit.rx(i, 2 * beta)
+    return circuit
+
+
+def random_benchmark(n, seed=0):
+    return random_circuit(n, 10 * n, seed)
+
+
+# Algorithm name -> (builder(n) -> Circuit on at most n qubits, smallest n)
+ALGORITHMS = {
+    "bernstein_vazirani": (bernstein_vazirani, 2),
+    "deutsch_jozsa": (deutsch_jozsa, 2),
+    "ghz": (ghz, 2),
+    "qft": (qft_benchmark, 2),
+    "iqft": (iqft_benchmark, 2),
+    "phase_estimation": (phase_estimation, 2),
+    "grover": (grover, 2),
+    "w_state": (w_state, 2),
+    "ripple_adder": (ripple_adder, 4),
+    "hidden_shift": (hidden_shift, 2),
+    "qaoa_maxcut": (qaoa_maxcut, 2),
+    "random": (random_benchmark, 3),
+}
+
+
+def benchmark_suite(widths, algorithms=None):
+    """
+    Yields (name, width, circuit) for every algorithm at every width it
+    fits in. circuit may use fewer than width qubits (see the builders).
+    """
+    for name in algorithms or ALGORITHMS:
+        builder, min_width = ALGORITHMS[name]
+        for n in widths:
+            if n >= min_width:
+                yield name, n, builder(n)
+
+
+def main():
+    # the ideal output of every check below should peak on a known state
+    from density_matrix_simulator import density_matrix_simulator
+
+    simulator = density_matrix_simulator()
+    for n in [2, 3, 5]:
+        for name, builder in [("qft", qft_benchmark), ("iqft", iqft_benchmark)]:
+            probs, _ = simulator.probabilities(builder(n))
+            status = "ok" if probs[0] > 1 - 1e-9 else "expected all zeros"
+            print(f"{name} n={n}: p(0...0)={probs[0]:.3f} {status}")
+    for n in [2, 3, 5, 7]:
+        # all ones on the data qubits, ancillas back in zero
+        m = (n + 2) // 2
+        probs, measured = simulator.probabilities(grover(n))
+        k = len(measured)
+        expected = int("".join("1" if q < m else "0" for q in measured), 2)
+        peak = int(np.argmax(probs))
+        status = "ok" if peak == expected and probs[peak] > 0.5 else f"expected {expected:0{k}b}"
+        print(f"grover n={n}: peak {peak:0{k}b} p={probs[peak]:.3f} {status}")
+    for n in [3, 4, 6]:
+        probs, _ = simulator.probabilities(phase_estimation(n))
+        expected = (round(2 ** (n - 1) / 3) << 1) | 1
+        peak = int(np.argmax(probs))
+        status = "ok" if peak == expected else f"expected {expected:0{n}b}"
+        print(f"phase_estimation n={n}: peak {peak:0{n}b} p={probs[peak]:.3f} {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+from itertools import product
+
+from braket.circuits import Circuit
+from braket.parametric import FreeParameter
+import numpy as np
+
+from circuits.iqft import iqft
+from circuits.qft import qft
+from compilers.batch_compile import compile_circuit
+from evaluation import exact_probabilities, to_logical
+
+
+class qft_template:
+    """
+    QFT (or IQFT) body built and compiled once, with the input bitstring
+    bound afterwards. Only the leading X layer depends on the input, so
+    every input reuses the same compiled body and vertex_map.
+    Without tables the body is used as built, on the identity placement.
+    max_degree builds the approximate QFT, see qft.
+    """
+
+    def __init__(self, n, inverse=False, tables=None, strategy="greedy_swap", cancel=True,
+                 max_degree=None):
+        self.n = n
+        body = iqft(n, max_degree) if inverse else qft(n, [], max_degree)
+        if tables is None:
+            self.body = body
+            self.vertex_map = list(range(n))
+        else:
+            self.body, vertex_map, _ = compile_circuit(body, tables, strategy, cancel)
+            if len(vertex_map) < n:
+                # an identity fallback could put two inputs on one physical qubit
+                raise ValueError(f"vertex_map covers {len(vertex_map)} of the {n} qubits of the body")
+            self.vertex_map = [int(vertex_map[i]) for i in range(n)]
+        self.parameters = [FreeParameter(f"b{i}") for i in range(n)]
+
+    def circuit(self, arr):
+        """
+        The compiled circuit for input arr, same as compiling qft(n, arr):
+        X on the physical qubit of every set bit, then the body
+        """
+        circuit = Circuit()
+        for i in range(len(arr)):
+            if arr[i] == 1:
+                circuit.x(self.vertex_map[i])
+        return circuit.add_circuit(self.body)
+
+    def parametric_circuit(self):
+        """
+        One circuit for every input: Rx(pi * b_i) on the physical qubit of
+        each input bit, then the body. Bind it with inputs(arr), through
+        device.run(..., inputs=...) or make_bound_circuit.
+        """
+        circuit = Circuit()
+        for i, parameter in enumerate(self.parameters):
+            circuit.rx(self.vertex_map[i], np.pi * parameter)
+        return circuit.add_circuit(self.body)
+
+    def inputs(self, arr):
+        return {parameter.name: float(bit) for parameter, bit in zip(self.parameters, arr)}
+
+    def sweep(self, device, inputs=None, noise_model=None):
+        """
+        Exact output distribution of every input, over the logical qubits.
+        inputs defaults to all 2^n basis states; noise_model, if given, is
+        applied to each circuit before it runs.
+        Return value: {input tuple: probabilities}
+        """
+        if inputs is None:
+            inputs = product((0, 1), repeat=self.n)
+        results = {}
+        for arr in inputs:
+            circuit = self.circuit(arr)
+            if noise_model is not None:
+                circuit = noise_model.apply(circuit)
+            probs, measured = exact_probabilities(circuit, device)
+            results[tuple(arr)] = to_logical(probs, measured, self.vertex_map, list(range(self.n)))
+        return results
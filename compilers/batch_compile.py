@@ -0,0 +1,174 @@
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+import numpy as np
+
+from compilers.circuit_dag import circuit_dag
+from compilers.gate_cancellation import gate_cancellation
+from compilers.placement import (
+    branch_and_bound,
+    demand_matrices,
+    local_search,
+    log_fidelities,
+    simulated_annealing,
+)
+from compilers.vertex_reindex import GreedyE, overall_vertex_map
+
+
+class calibration_tables:
+    """
+    Everything the placement strategies derive from one calibration,
+    computed once and shared by every circuit in a batch.
+    """
+
+    def __init__(self, qubit_fidelities, gate_fidelities):
+        self.qubit_fidelities = list(qubit_fidelities)
+        self.gate_fidelities = np.asarray(gate_fidelities, dtype=float)
+        self.num_qubits = len(self.qubit_fidelities)
+        self.l1, self.l2 = log_fidelities(self.qubit_fidelities, self.gate_fidelities)
+        # physical qubits from best to worst
+        self.ranking = np.argsort(-np.asarray(self.qubit_fidelities), kind="stable")
+
+
+def _identity(dag, U, u, tables, **options):
+    return {i: i for i in range(len(u))}
+
+
+def _greedy_v(dag, U, u, tables, **options):
+    # GreedyV with the precomputed ranking instead of a sort per circuit
+    order = np.argsort(-U.sum(axis=1), kind="stable")
+    return {int(q): int(p) for q, p in zip(order, tables.ranking)}
+
+
+def _greedy_e(dag, U, u, tables, **options):
+    return GreedyE(U, tables.gate_fidelities, tables.qubit_fidelities)
+
+
+def _greedy_swap(dag, U, u, tables, **options):
+    start = _greedy_e(dag, U, u, tables)
+    vertex_map, _, _ = local_search(U, u, tables.l1, tables.l2, start, **options)
+    return vertex_map
+
+
+def _overall(dag, U, u, tables, **options):
+    # place onto the whole device, then keep only the circuit's qubits
+    vertex_map = overall_vertex_map(
+        dag, tables.num_qubits, tables.qubit_fidelities, tables.gate_fidelities
+    )
+    return {q: p for q, p in vertex_map.items() if q < len(u)}
+
+
+def _exact(dag, U, u, tables, **options):
+    # the search is exponential in circuit width, so bound it unless the
+    # caller asks otherwise (time_budget=None searches to the end)
+    options.setdefault("time_budget", 10.0)
+    start = _greedy_v(dag, U, u, tables)
+    vertex_map, _, _ = branch_and_bound(U, u, tables.l1, tables.l2, incumbent=start, **options)
+    return vertex_map
+
+
+def _annealed(dag, U, u, tables, **options):
+    start = _greedy_swap(dag, U, u, tables)
+    vertex_map, _, _ = simulated_annealing(U, u, tables.l1, tables.l2, start, **options)
+    return vertex_map
+
+
+# Placement strategy name -> function(dag, U, u, tables, **options) -> vertex_map
+STRATEGIES = {
+    "identity": _identity,
+    "greedy_v": _greedy_v,
+    "greedy_e": _greedy_e,
+    "greedy_swap": _greedy_swap,
+    "reorder_overall": _overall,
+    "exact": _exact,
+    "annealed": _annealed,
+}
+
+
+def compile_circuit(circuit, tables, strategy="greedy_swap", cancel=True, **options):
+    """
+    Gate cancellation (if cancel is set), placement with the named strategy
+    and relabelling, all on one circuit_dag. Extra keyword arguments go to
+    the placement strategy.
+    Return value: (compiled circuit, vertex_map, timings) where timings
+    holds the seconds spent in each stage
+    """
+    timings = {}
+    start = time.perf_counter()
+
+    dag = circuit_dag.from_circuit(circuit)
+    if cancel:
+        gate_cancellation(dag)
+    timings["cancel"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    num_logical = int(dag.qubits.max(initial=-1)) + 1
+    if num_logical > tables.num_qubits:
+        raise ValueError(f"circuit uses {num_logical} qubits, the device has {tables.num_qubits}")
+    U, u = demand_matrices(dag, num_logical)
+    vertex_map = STRATEGIES[strategy](dag, U, u, tables, **options)
+    timings["placement"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    dag.relabel(vertex_map)
+    compiled = dag.to_circuit()
+    timings["rewrite"] = time.perf_counter() - mark
+
+    timings["total"] = time.perf_counter() - start
+    return compiled, vertex_map, timings
+
+
+# Per-process state for batch_compile workers, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(tables, strategy, cancel, options):
+    _worker.update(tables=tables, strategy=strategy, cancel=cancel, options=options)
+
+
+def _compile_in_worker(circuit):
+    return compile_circuit(
+        circuit, _worker["tables"], _worker["strategy"], _worker["cancel"], **_worker["options"]
+    )
+
+
+def batch_compile(circuits, qubit_fidelities, gate_fidelities, strategy="greedy_swap",
+                  cancel=True, max_workers=None, chunksize=1, **options):
+    """
+    Compiles every circuit in circuits against one calibration. The
+    calibration tables are built once and handed to each worker once.
+    With max_workers=1 everything runs in this process.
+    Yields (compiled circuit, vertex_map, timings) in input order, as soon
+    as each one (and everything before it) is done.
+    """
+    tables = calibration_tables(qubit_fidelities, gate_fidelities)
+    if max_workers == 1:
+        for circuit in circuits:
+            yield compile_circuit(circuit, tables, strategy, cancel, **options)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(tables, strategy, cancel, options),
+    ) as pool:
+        yield from pool.map(_compile_in_worker, circuits, chunksize=chunksize)
+
+
+def main():
+    # reorder_overall must reach past the first circuit-width physical qubits
+    from braket.circuits import Circuit
+
+    qubit_fidelities = np.full(11, 0.9)
+    best = [1, 3, 6, 10]
+    qubit_fidelities[best] = [0.99, 0.98, 0.97, 0.96]
+    gate_fidelities = np.outer(qubit_fidelities, qubit_fidelities)
+    tables = calibration_tables(qubit_fidelities, gate_fidelities)
+    ghz = Circuit().h(0).cnot(0, 1).cnot(1, 2).cnot(2, 3)
+    _, vertex_map, _ = compile_circuit(ghz, tables, "reorder_overall")
+    status = "ok" if sorted(vertex_map.values()) == best else f"expected qubits {best}"
+    print(f"reorder_overall ghz(4): {vertex_map} {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from braket.circuits import Circuit, Instruction, gates
+from braket.parametric import FreeParameterExpression
+import numpy as np
+
+from compilers.instruction_rewrite import GATE_TYPES, rewrite_instruction
+
+
+# Gate types stored inline as an op code plus at most one angle
+INLINE_TYPES = frozenset(GATE_TYPES)
+
+# Operator type <-> op code. Codes for other operator types are handed out
+# on first use, so the table grows with whatever shows up.
+OPCODES = list(GATE_TYPES)
+OPCODE_OF = {op_type: code for code, op_type in enumerate(OPCODES)}
+OPCODE_NAMES = [op_type.__name__ for op_type in OPCODES]
+
+# Parameter-free operators are immutable, so one instance per code is reused
+_SHARED_OPERATORS = {}
+
+
+def opcode(op_type):
+    try:
+        return OPCODE_OF[op_type]
+    except KeyError:
+        OPCODE_OF[op_type] = len(OPCODES)
+        OPCODES.append(op_type)
+        OPCODE_NAMES.append(op_type.__name__)
+        return OPCODE_OF[op_type]
+
+
+class circuit_dag:
+    """
+    Array-backed DAG of a circuit. Node i is the i'th instruction:
+    op[i] is its op code, angle[i] its angle (nan if it has none),
+    qubits[i, :arity[i]] its targets, and prev[i, k] / next[i, k] the node
+    before and after it on the wire qubits[i, k] (-1 at the ends of the
+    wire). Node order is always a valid topological order.
+
+    Instructions that do not fit this form (control or power modifiers,
+    gates outside INLINE_TYPES, free parameter angles, noise) are kept
+    whole in opaque, but are still linked into the wires.
+    """
+
+    def __init__(self, size, width=3):
+        self.op = np.zeros(size, dtype=np.int16)
+        self.angle = np.full(size, np.nan)
+        self.qubits = np.full((size, width), -1, dtype=np.int32)
+        self.arity = np.zeros(size, dtype=np.int8)
+        self.prev = np.full((size, width), -1, dtype=np.int32)
+        self.next = np.full((size, width), -1, dtype=np.int32)
+        self.alive = np.ones(size, dtype=bool)
+        self.opaque = {}
+        self.first = {}
+        self.last = {}
+
+    @classmethod
+    def from_circuit(cls, circuit):
+        return cls.from_instructions(circuit.instructions)
+
+    @classmethod
+    def from_instructions(cls, instructions):
+        instructions = list(instructions)
+        all_wires = [
+            [int(q) for q in inst.control] + [int(q) for q in inst.target]
+            for inst in instructions
+        ]
+        width = max([3] + [len(wires) for wires in all_wires])
+        dag = cls(len(instructions), width)
+        for i, (inst, wires) in enumerate(zip(instructions, all_wires)):
+            operator = inst.operator
+            dag.op[i] = opcode(type(operator))
+            if type(operator) not in INLINE_TYPES or inst.control or inst.power != 1:
+                dag.opaque[i] = inst
+            elif isinstance(operator, gates.AngledGate):
+                if isinstance(operator.angle, FreeParameterExpression):
+                    # angle stays nan; the original operator is lowered as is
+                    dag.opaque[i] = inst
+                else:
+                    dag.angle[i] = operator.angle
+            dag.arity[i] = len(wires)
+            for k, q in enumerate(wires):
+                dag.qubits[i, k] = q
+                last = dag.last.get(q, -1)
+                dag.prev[i, k] = last
+                if last < 0:
+                    dag.first[q] = i
+                else:
+                    dag.next[last, dag.slot(last, q)] = i
+                dag.last[q] = i
+        return dag
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def nodes(self):
+        """
+        Indices of the live nodes, in topological order.
+        """
+        return np.flatnonzero(self.alive)
+
+    def name(self, i):
+        return OPCODE_NAMES[self.op[i]]
+
+    def targets(self, i):
+        return self.qubits[i, : self.arity[i]].tolist()
+
+    def slot(self, i, q):
+        """
+        Position of wire q in node i's qubits.
+        """
+        return int(np.flatnonzero(self.qubits[i, : self.arity[i]] == q)[0])
+
+    def predecessors(self, i):
+        return self.prev[i, : self.arity[i]]
+
+    def remove(self, i):
+        """
+        Unlinks node i from all its wires.
+        """
+        for k in range(self.arity[i]):
+            q = int(self.qubits[i, k])
+            before = self.prev[i, k]
+            after = self.next[i, k]
+            if before < 0:
+                if after < 0:
+                    del self.first[q]
+                else:
+                    self.first[q] = after
+            else:
+                self.next[before, self.slot(before, q)] = after
+            if after < 0:
+                if before < 0:
+                    del self.last[q]
+                else:
+                    self.last[q] = before
+            else:
+                self.prev[after, self.slot(after, q)] = before
+        self.alive[i] = False
+        self.opaque.pop(i, None)
+
+    def set_angle(self, i, angle):
+        self.angle[i] = angle
+
+    def relabel(self, vertex_map):
+        """
+        Sends every qubit through vertex_map (logical -> physical) in place.
+        """
+        size = max(max(vertex_map) if vertex_map else 0, int(self.qubits.max(initial=0))) + 1
+        lut = np.arange(size, dtype=np.int32)
+        for logical, physical in vertex_map.items():
+            lut[logical] = physical
+        used = self.qubits >= 0
+        self.qubits[used] = lut[self.qubits[used]]
+        self.first = {int(lut[q]): i for q, i in self.first.items()}
+        self.last = {int(lut[q]): i for q, i in self.last.items()}
+        for i, inst in self.opaque.items():
+            self.opaque[i] = rewrite_instruction(inst, vertex_map)
+
+    def operator(self, i, invert=False):
+        code = self.op[i]
+        if np.isnan(self.angle[i]):
+            try:
+                return _SHARED_OPERATORS[code]
+            except KeyError:
+                operator = _SHARED_OPERATORS[code] = OPCODES[code]()
+                return operator
+        angle = float(self.angle[i])
+        return OPCODES[code](-angle if invert else angle)
+
+    def instruction(self, i, invert=False):
+        if i in self.opaque:
+            return rewrite_instruction(self.opaque[i], invert=invert)
+        return Instruction(self.operator(i, invert), self.targets(i))
+
+    def instructions(self, invert=False):
+        for i in self.nodes():
+            yield self.instruction(i, invert)
+
+    def to_circuit(self, invert=False):
+        """
+        Lowers the live nodes back to a Circuit in one bulk add.
+        """
+        return Circuit(self.instructions(invert))
@@ -0,0 +1,169 @@
+from collections import OrderedDict
+import hashlib
+import json
+import numbers
+import os
+import pickle
+
+import numpy as np
+
+from compilers.batch_compile import compile_circuit
+
+
+def _parameter_key(p):
+    # FreeParameter(Expression)s hash by their expression, e.g. "2*theta"
+    if isinstance(p, numbers.Number):
+        return repr(float(p))
+    return str(p)
+
+
+def _update_matrices(h, operator):
+    # Unitary and Kraus are defined by their matrices, not by a name and
+    # parameters; other operators have nothing to add
+    from braket.circuits import gates, noises
+
+    if isinstance(operator, gates.Unitary):
+        matrices = [operator.to_matrix()]
+    elif isinstance(operator, noises.Kraus):
+        matrices = operator.to_matrix()
+    else:
+        return
+    for matrix in matrices:
+        matrix = np.asarray(matrix)
+        h.update(repr((str(matrix.dtype), matrix.shape)).encode())
+        h.update(np.ascontiguousarray(matrix).tobytes())
+
+
+def circuit_fingerprint(circuit):
+    """
+    Hash of the canonical instruction stream: operator name, parameters,
+    matrices, targets, controls and power of every instruction, in order.
+    """
+    h = hashlib.sha256()
+    for inst in circuit.instructions:
+        operator = inst.operator
+        params = [_parameter_key(p) for p in getattr(operator, "parameters", [])]
+        _update_matrices(h, operator)
+        h.update(repr((
+            operator.name,
+            params,
+            [int(q) for q in inst.target],
+            [int(q) for q in inst.control],
+            inst.control_state,
+            inst.power,
+        )).encode())
+    return h.hexdigest()
+
+
+def tables_fingerprint(tables):
+    """
+    Hash of the fidelities behind a calibration_tables
+    """
+    h = hashlib.sha256()
+    h.update(np.asarray(tables.qubit_fidelities, dtype=np.float64).tobytes())
+    h.update(np.asarray(tables.gate_fidelities, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class compile_cache:
+    """
+    Content addressed store of compile_circuit results, keyed by the
+    circuit's instruction stream, the calibration, the strategy and its
+    options. Keeps the max_entries most recently used results in memory and,
+    if cache_dir is set, every result on disk as a pickle.
+    hits, misses and evictions count lookups; disk_hits counts the misses in
+    memory that were found on disk.
+    """
+
+    def __init__(self, max_entries=128, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+    def key(self, circuit, tables, strategy, cancel, options):
+        payload = json.dumps(
+            [circuit_fingerprint(circuit), tables_fingerprint(tables), strategy, cancel, options],
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key):
+        """
+        Return value: (compiled circuit, vertex_map) for key, or None
+        """
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, entry)
+        else:
+            self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, compiled, vertex_map):
+        entry = (compiled, vertex_map)
+        self._insert(key, entry)
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write next to the target and rename so readers never see half a file
+            tmp_path = self.path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(entry, f)
+            os.replace(tmp_path, self.path(key))
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        if self.cache_dir is None or not os.path.exists(self.path(key)):
+            return None
+        with open(self.path(key), "rb") as f:
+            return pickle.load(f)
+
+    def clear(self):
+        self._entries.clear()
+        if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_hits": self.disk_hits,
+            "entries": len(self._entries),
+        }
+
+    def compile(self, circuit, tables, strategy="greedy_swap", cancel=True, **options):
+        """
+        compile_circuit through the cache.
+        Return value: (compiled circuit, vertex_map). The circuit is shared
+        with the cache, so copy it before modifying it.
+        """
+        key = self.key(circuit, tables, strategy, cancel, options)
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        compiled, vertex_map, _ = compile_circuit(circuit, tables, strategy, cancel, **options)
+        self.put(key, compiled, vertex_map)
+        return compiled, vertex_map
@@ -0,0 +1,169 @@
+import numpy as np
+
+
+# Gate name -> list of (qubit slot a, qubit slot b, native two qubit gates
+# a -> b) in the usual CNOT decomposition of the gate. Slots index the
+# gate's targets in order.
+GATE_PAIR_WEIGHTS = {
+    "CNot": [(0, 1, 1)],
+    "CY": [(0, 1, 1)],
+    "CZ": [(0, 1, 1)],
+    "ECR": [(0, 1, 1)],
+    "CV": [(0, 1, 2)],
+    "CPhaseShift": [(0, 1, 2)],
+    "CPhaseShift00": [(0, 1, 2)],
+    "CPhaseShift01": [(0, 1, 2)],
+    "CPhaseShift10": [(0, 1, 2)],
+    "XX": [(0, 1, 2)],
+    "YY": [(0, 1, 2)],
+    "ZZ": [(0, 1, 2)],
+    "XY": [(0, 1, 2)],
+    "MS": [(0, 1, 2)],
+    "ISwap": [(0, 1, 2)],
+    "PSwap": [(0, 1, 3)],
+    "Swap": [(0, 1, 3)],
+    # two CNOTs between each pair of qubits
+    "CCNot": [(0, 2, 2), (1, 2, 2), (0, 1, 2)],
+    # CNot(t2, t1) CCNot(c, t1, t2) CNot(t2, t1)
+    "CSwap": [(2, 1, 2), (0, 2, 2), (1, 2, 2), (0, 1, 2)],
+}
+
+
+def gate_pairs(name, width):
+    """
+    Return value: GATE_PAIR_WEIGHTS entry for a gate, or for a gate not
+    listed there, three native gates (a generic two qubit unitary) between
+    every pair of its qubits
+    """
+    try:
+        return GATE_PAIR_WEIGHTS[name]
+    except KeyError:
+        return [(a, b, 3) for a in range(width) for b in range(a + 1, width)]
+
+
+class demand_builder:
+    """
+    Interaction graph of a circuit: U[i][j] is the expected number of
+    native two qubit gates from logical qubit i -> j, and u[i] the number
+    of single qubit gates on i. Instructions can be added one at a time as
+    a circuit grows, so the demand never needs a full rescan.
+
+    With sparse=True the two qubit demand is kept as COO triplets, which
+    is what wide circuits want; otherwise it is a dense matrix that grows
+    with the largest qubit index seen.
+    """
+
+    def __init__(self, num_qubits=0, sparse=False):
+        self.num_qubits = num_qubits
+        self.sparse = sparse
+        self.u = np.zeros(num_qubits)
+        if sparse:
+            self.rows, self.cols, self.data = [], [], []
+        else:
+            self.U = np.zeros((num_qubits, num_qubits))
+
+    @classmethod
+    def from_circuit(cls, circuit, num_qubits=0, sparse=False):
+        builder = cls(num_qubits, sparse)
+        builder.add_instructions(circuit.instructions)
+        return builder
+
+    @classmethod
+    def from_dag(cls, dag, num_qubits=0, sparse=False):
+        builder = cls(num_qubits, sparse)
+        builder.add_dag(dag)
+        return builder
+
+    def _grow(self, num_qubits):
+        if num_qubits <= self.num_qubits:
+            return
+        self.u = np.pad(self.u, (0, num_qubits - self.num_qubits))
+        if not self.sparse:
+            pad = num_qubits - self.num_qubits
+            self.U = np.pad(self.U, ((0, pad), (0, pad)))
+        self.num_qubits = num_qubits
+
+    def _add_pairs(self, a, b, weight):
+        if self.sparse:
+            self.rows.extend(np.atleast_1d(a).tolist())
+            self.cols.extend(np.atleast_1d(b).tolist())
+            self.data.extend(np.broadcast_to(weight, np.shape(np.atleast_1d(a))).tolist())
+        else:
+            np.add.at(self.U, (a, b), weight)
+
+    def add(self, instruction):
+        """
+        Adds the demand of one instruction.
+        """
+        qubits = [int(q) for q in instruction.control] + [int(q) for q in instruction.target]
+        self._grow(max(qubits) + 1)
+        if len(qubits) == 1:
+            self.u[qubits[0]] += 1
+            return
+        name = instruction.operator.name
+        if instruction.control:
+            # a controlled gate costs at least a CNOT per control
+            pairs = [(k, len(qubits) - 1, 1) for k in range(len(instruction.control))]
+        else:
+            pairs = gate_pairs(name, len(qubits))
+        for a, b, weight in pairs:
+            self._add_pairs(qubits[a], qubits[b], weight)
+
+    def add_instructions(self, instructions):
+        for instruction in instructions:
+            self.add(instruction)
+
+    def add_dag(self, dag):
+        """
+        Adds the demand of every live node of a circuit_dag, one vectorized
+        update per gate type.
+        """
+        from compilers.circuit_dag import OPCODE_NAMES
+
+        live = dag.alive
+        self._grow(int(dag.qubits.max(initial=-1)) + 1)
+        single = live & (dag.arity == 1)
+        self.u += np.bincount(dag.qubits[single, 0], minlength=self.num_qubits)[: self.num_qubits]
+
+        # opaque nodes carry modifiers or unusual gates: take them one by one
+        for i, instruction in dag.opaque.items():
+            if live[i] and dag.arity[i] > 1:
+                self.add(instruction)
+        inline = live & (dag.arity > 1)
+        inline[list(dag.opaque)] = False
+        for code in np.unique(dag.op[inline]):
+            nodes = inline & (dag.op == code)
+            pairs = gate_pairs(OPCODE_NAMES[code], int(dag.arity[nodes][0]))
+            for a, b, weight in pairs:
+                self._add_pairs(dag.qubits[nodes, a], dag.qubits[nodes, b], weight)
+
+    def matrix(self):
+        """
+        Return value: U as a dense array, or as a scipy coo_matrix when
+        the builder is sparse
+        """
+        if self.sparse:
+            from scipy.sparse import coo_matrix
+
+            shape = (self.num_qubits, self.num_qubits)
+            return coo_matrix((self.data, (self.rows, self.cols)), shape=shape)
+        return self.U
+
+    def dense(self):
+        if self.sparse:
+            return self.matrix().toarray()
+        return self.U.copy()
+
+    def edges(self):
+        """
+        Return value: list of sets where edges[i] holds every j with
+        U[i][j] > 0
+        """
+        out = [set() for _ in range(self.num_qubits)]
+        if self.sparse:
+            pairs = zip(self.rows, self.cols)
+        else:
+            pairs = zip(*np.nonzero(self.U))
+        for a, b in pairs:
+            out[int(a)].add(int(b))
+        return out
@@ -1,135 +1,162 @@
-from braket.aws import AwsDevice
-from braket.circuits import Circuit, gates, noises, observables
-from braket.devices import LocalSimulator
-from braket.parametric import FreeParameter
-import numpy as np
-from scipy.stats import unitary_group
 import math
 
+import numpy as np
+
+
+# Gates that are their own inverse, and pairs of gates that invert each other
+SELF_INVERSE = {"H", "X", "Y", "Z", "CNot", "CZ", "Swap", "CCNot", "CSwap"}
+INVERSE_PAIRS = {
+    ("S", "Si"), ("Si", "S"),
+    ("T", "Ti"), ("Ti", "T"),
+    ("V", "Vi"), ("Vi", "V"),
+}
+# Rotations where two adjacent gates on the same qubits add their angles
+ROTATIONS = {
+    "Rx", "Ry", "Rz", "PhaseShift", "CPhaseShift",
+    "CPhaseShift00", "CPhaseShift01", "CPhaseShift10",
+    "XX", "YY", "ZZ", "XY",
+}
+# Angle after which a rotation is back to the identity (up to global
+# phase), where it is not 2*pi. XY(2*pi) = diag(1, -1, -1, 1).
+ROTATION_PERIODS = {"XY": 4 * math.pi}
+# Two-qubit gates that do not depend on the order of their targets
+SYMMETRIC = {"CZ", "Swap", "CPhaseShift", "XX", "YY", "ZZ", "XY"}
+
+
+def _same_targets(name, a, b):
+    if name in SYMMETRIC:
+        return set(a) == set(b)
+    return tuple(a) == tuple(b)
+
+
+def _is_zero_angle(angle, atol, period=2 * math.pi):
+    # Rotations by a full period are at most a global phase away from the
+    # identity
+    return abs(math.remainder(angle, period)) < atol
+
 
-def convert_instructions(instructions, n):
+def gate_cancellation(dag, atol=1e-9):
     """
-    converts the braket base instructions file into a form that is easier to work with
+    Removes adjacent pairs of gates that multiply to the identity and merges
+    adjacent rotations on the same qubits, dropping those whose angle ends
+    up at zero. Identity gates are removed. Works on a circuit_dag in place.
+
+    Nodes are visited in order, and a node's predecessors on its wires are
+    always the latest gates still alive there. A cancellation unlinks both
+    nodes and exposes the previous gates to the next node, which reaches
+    the fixpoint in one linear sweep.
+    Return value: the number of gates removed
     """
-    
-    max_qubit_index = n
-    qubit_operations = [[] for _ in range(max_qubit_index)]
-    
-    for i in range(0, len(instructions)):
-        inst = instructions[i]
-        if(len(inst.target) > 1):
-            qubit_operations[inst.target[0]].append({'operator': inst.operator.name, 'time' : i, 'first': True })
-            qubit_operations[inst.target[1]].append({'operator': inst.operator.name, 'time' : i, 'first': False})
-        else:
-            qubit_operations[inst.target[0]].append({'operator': inst.operator.name, 'time': i})
-                
-    return qubit_operations
+    removed = 0
+
+    for i in dag.nodes():
+        if i in dag.opaque:
+            continue
+        name = dag.name(i)
+
+        if name == "I":
+            dag.remove(i)
+            removed += 1
+            continue
+
+        preds = dag.predecessors(i)
+        prev = int(preds[0])
+        if prev < 0 or (preds != prev).any() or prev in dag.opaque:
+            continue
+        if dag.arity[prev] != dag.arity[i]:
+            continue
+        prev_name = dag.name(prev)
+        targets = dag.targets(i)
+        prev_targets = dag.targets(prev)
 
-def gate_cancellation(instruct_arr):
+        if (prev_name == name and name in SELF_INVERSE) or (prev_name, name) in INVERSE_PAIRS:
+            if _same_targets(name, prev_targets, targets):
+                dag.remove(i)
+                dag.remove(prev)
+                removed += 2
+        elif prev_name == name and name in ROTATIONS and _same_targets(name, prev_targets, targets):
+            angle = dag.angle[prev] + dag.angle[i]
+            dag.remove(i)
+            removed += 1
+            if _is_zero_angle(angle, atol, ROTATION_PERIODS.get(name, 2 * math.pi)):
+                dag.remove(prev)
+                removed += 1
+            else:
+                dag.set_angle(prev, angle)
+
+    return removed
+
+
+def get_gate_cancelled_circuit(circuit, n=None):
     """
-    Goes through truncated form of circuit and removes operators which square to the identity.
+    Takes in the circuit and returns a new circuit with gate_cancellation
+    applied. The input circuit is not modified; n is accepted for backwards
+    compatibility and no longer needed.
     """
-    for gateLine in instruct_arr:
-        i = 1
-        while(i < len(gateLine)):
-            # print(gateLine[i])
-            a = gateLine[i]['operator']
-            b = gateLine[i-1]['operator']
-            if(a == b and (a == 'H' or a == 'X' or a == 'Y' or a == 'Z')):
-                del gateLine[i]
-                del gateLine[i-1]
-            i += 1
-            
-
-def get_gate_cancelled_circuit(circuit,n):
+    from compilers.circuit_dag import circuit_dag
+
+    dag = circuit_dag.from_circuit(circuit)
+    gate_cancellation(dag)
+    return dag.to_circuit()
+
+
+def _fuzz_circuit(rng, num_qubits, num_gates):
     """
-    Takes in the circuit and then removes any duplicate graphs.
-    * Put in the parameter of number of total qubits along with the circuit
+    Random circuit over the gates in REWRITE_TABLE with angles from
+    multiples of pi/2, so that merged rotations often land on full turns
     """
-    
-    instructs = convert_instructions(circuit.instructions,n)
-    gate_cancellation(instructs)
-    
-    new_circuit = Circuit()
-    
-    for i in range(0, n):
-        circuit.i(i)
-    
-    # print(circuit.instructions)
-    
-    for i in range(len(circuit.instructions)):
-        row = circuit.instructions[i]
-
-        op_name = row.operator.name
-        
-        target = row.target
-        
-        if(len(instructs[target[0]]) == 0 or instructs[target[0]][0]['time'] != i):
-            continue
+    from braket.circuits import Circuit, Instruction, gates
+
+    from compilers.instruction_rewrite import GATE_TYPES
+
+    gate_types = [g for g in GATE_TYPES if g.fixed_qubit_count() <= num_qubits]
+    circuit = Circuit()
+    for q in range(num_qubits):
+        circuit.i(q)
+    for _ in range(num_gates):
+        gate_type = gate_types[rng.integers(len(gate_types))]
+        target = rng.choice(num_qubits, gate_type.fixed_qubit_count(), replace=False).tolist()
+        if issubclass(gate_type, gates.AngledGate):
+            operator = gate_type(float(rng.integers(-4, 5)) * math.pi / 2)
+        else:
+            operator = gate_type()
+        circuit.add_instruction(Instruction(operator, target))
+        # repeat gates often, so that there is something to cancel
+        if rng.random() < 0.5:
+            circuit.add_instruction(Instruction(operator, target))
+    return circuit
+
+
+def unitary_mismatches(num_circuits=200, num_qubits=3, num_gates=12, seed=0, atol=1e-6):
+    """
+    Runs get_gate_cancelled_circuit on random circuits and checks that the
+    output unitary equals the input's up to global phase.
+    Return value: list of the input circuits that changed their unitary
+    """
+    from braket.circuits import Circuit
+
+    rng = np.random.default_rng(seed)
+    mismatches = []
+    dim = 2**num_qubits
+    for _ in range(num_circuits):
+        circuit = _fuzz_circuit(rng, num_qubits, num_gates)
+        cancelled = Circuit()
+        # keep every qubit, even if all of its gates cancelled
+        for q in range(num_qubits):
+            cancelled.i(q)
+        cancelled.add_circuit(get_gate_cancelled_circuit(circuit))
+        overlap = abs(np.trace(circuit.to_unitary().conj().T @ cancelled.to_unitary())) / dim
+        if abs(overlap - 1) > atol:
+            mismatches.append(circuit)
+    return mismatches
+
+
+def main():
+    mismatches = unitary_mismatches()
+    for circuit in mismatches:
+        print(circuit)
+    print(f"{len(mismatches)} of 200 circuits changed their unitary")
+
 
-        if op_name == "H":
-            new_circuit.h(target)
-        elif op_name == "I":
-            new_circuit.i(target)
-        elif op_name == "X":
-            new_circuit.x(target)
-        elif op_name == "Y":
-            new_circuit.y(target)
-        elif op_name == "Z":
-            new_circuit.z(target)
-        elif op_name == "S":
-            new_circuit.s(target)
-        elif op_name == "Si":
-            new_circuit.si(target)
-        elif op_name == "T":
-            new_circuit.t(target)
-        elif op_name == "Ti":
-            new_circuit.ti(target)
-        elif op_name == "V":
-            new_circuit.v(target)
-        elif op_name == "V":
-            new_circuit.vi(target)
-        elif op_name == "Rx":
-            new_circuit.rx(target, -row.operator.anglegle)
-        elif op_name == "Ry":
-            new_circuit.ry(target, -row.operator.angle)
-        elif op_name == "Rz":
-            new_circuit.rz(target, -row.operator.angle)
-        elif op_name == "PhaseShift":
-            new_circuit.phaseshift(target, -row.operator.angle)
-        elif op_name == "CNot":
-            new_circuit.cnot(*target)
-        elif op_name == "Swap":
-            new_circuit.swap(*target)
-        elif op_name == "ISwap":
-            new_circuit.iswap(*target, -np.pi / 2)
-        elif op_name == "PSwap":
-            new_circuit.pswap(*target, -row.operator.angle)
-        elif op_name == "XY":
-            new_circuit.xy(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift":
-            new_circuit.cphaseshift(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift00":
-            new_circuit.cphaseshift00(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift01":
-            new_circuit.cphaseshift01(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift10":
-            new_circuit.cphaseshift10(*target, -row.operator.angle)
-        elif op_name == "CY":
-            new_circuit.cy(*target)
-        elif op_name == "CZ":
-            new_circuit.cz(*target)
-        elif op_name == "XX":
-            new_circuit.xx(*target, -row.operator.angle)
-        elif op_name == "YY":
-            new_circuit.yy(*target, -row.operator.angle)
-        elif op_name == "ZZ":
-            new_circuit.zz(*target, -row.operator.angle)
-        elif op_name == "CCNot":
-            new_circuit.ccnot(*target)
-        elif op_name == "CSwap":
-            new_circuit.cswap(*target)
-            
-        del instructs[target[0]][0]           
-    return new_circuit
-        
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+from braket.circuits import Circuit, Instruction, gates
+import random
+import time
+
+
+def _same(operator, invert):
+    return operator
+
+
+def _angled(operator, invert):
+    if not invert:
+        return operator
+    return type(operator)(-operator.angle)
+
+
+# Operator type -> builder for the rewritten operator. Gates without
+# parameters are immutable, so the original operator object is reused.
+REWRITE_TABLE = {
+    gates.H: _same,
+    gates.I: _same,
+    gates.X: _same,
+    gates.Y: _same,
+    gates.Z: _same,
+    gates.S: _same,
+    gates.Si: _same,
+    gates.T: _same,
+    gates.Ti: _same,
+    gates.V: _same,
+    gates.Vi: _same,
+    gates.Rx: _angled,
+    gates.Ry: _angled,
+    gates.Rz: _angled,
+    gates.PhaseShift: _angled,
+    gates.CNot: _same,
+    gates.Swap: _same,
+    gates.ISwap: _same,
+    gates.PSwap: _angled,
+    gates.XY: _angled,
+    gates.CPhaseShift: _angled,
+    gates.CPhaseShift00: _angled,
+    gates.CPhaseShift01: _angled,
+    gates.CPhaseShift10: _angled,
+    gates.CY: _same,
+    gates.CZ: _same,
+    gates.XX: _angled,
+    gates.YY: _angled,
+    gates.ZZ: _angled,
+    gates.CCNot: _same,
+    gates.CSwap: _same,
+}
+# The gates listed above, before any lazily added entries
+GATE_TYPES = tuple(REWRITE_TABLE)
+
+
+def _builder(operator):
+    """
+    Looks up the builder for an operator, adding an entry for operator
+    types that are not in the table yet (noise, other native gates).
+    """
+    op_type = type(operator)
+    try:
+        return REWRITE_TABLE[op_type]
+    except KeyError:
+        builder = _angled if isinstance(operator, gates.AngledGate) else _same
+        REWRITE_TABLE[op_type] = builder
+        return builder
+
+
+def rewrite_instruction(instruction, vertex_map=None, invert=False):
+    """
+    Returns a copy of instruction with every qubit sent through vertex_map
+    (logical -> physical) and, if invert is set, every angle negated.
+    """
+    operator = instruction.operator
+    new_operator = _builder(operator)(operator, invert)
+    if vertex_map is None:
+        if new_operator is operator:
+            return instruction
+        target = instruction.target
+        control = instruction.control
+    else:
+        target = [vertex_map[q] for q in instruction.target]
+        control = [vertex_map[q] for q in instruction.control]
+    return Instruction(
+        new_operator,
+        target,
+        control=control,
+        control_state=instruction.control_state,
+        power=instruction.power,
+    )
+
+
+def rewrite_instructions(instructions, vertex_map=None, invert=False):
+    for instruction in instructions:
+        yield rewrite_instruction(instruction, vertex_map, invert)
+
+
+def rewrite_circuit(instructions, vertex_map=None, invert=False):
+    """
+    Builds a new Circuit from instructions in one bulk add, rewriting each
+    one with rewrite_instruction.
+    """
+    return Circuit(rewrite_instructions(instructions, vertex_map, invert))
+
+
+def random_circuit(num_qubits, num_gates, seed=0):
+    """
+    Random circuit over the gates in REWRITE_TABLE, used for benchmarking.
+    """
+    rng = random.Random(seed)
+    gate_types = list(REWRITE_TABLE)
+    instructions = []
+    for _ in range(num_gates):
+        gate_type = rng.choice(gate_types)
+        size = gate_type.fixed_qubit_count()
+        target = rng.sample(range(num_qubits), size)
+        if issubclass(gate_type, gates.AngledGate):
+            operator = gate_type(rng.uniform(-3.14, 3.14))
+        else:
+            operator = gate_type()
+        instructions.append(Instruction(operator, target))
+    return Circuit(instructions)
+
+
+def main():
+    num_qubits = 11
+    for num_gates in [10000, 50000]:
+        circuit = random_circuit(num_qubits, num_gates)
+        vertex_map = {i: (i * 7) % num_qubits for i in range(num_qubits)}
+
+        start = time.perf_counter()
+        rewrite_circuit(circuit.instructions, vertex_map)
+        elapsed = time.perf_counter() - start
+
+        print(f"{num_gates} gates: {elapsed:.3f}s ({elapsed / num_gates * 1e6:.1f} us/gate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+from concurrent.futures import ProcessPoolExecutor
+import time
+
+import numpy as np
+
+from compilers.demand import demand_builder
+
+
+def log_fidelities(qubit_fidelities, gate_fidelities):
+    """
+    Return value: (l1, l2) where l1[p] = -ln(fidelity of physical qubit p)
+    and l2[a][b] = -ln(fidelity of a gate from a -> b). Both are costs, so
+    smaller is better. The diagonal of l2 is never used by an injective
+    mapping and is set to 0.
+    """
+    f1 = np.clip(np.asarray(qubit_fidelities, dtype=float), 1e-12, 1.0)
+    f2 = np.clip(np.asarray(gate_fidelities, dtype=float), 1e-12, 1.0)
+    l2 = -np.log(f2)
+    np.fill_diagonal(l2, 0.0)
+    return -np.log(f1), l2
+
+
+def demand_matrices(dag, num_qubits):
+    """
+    Return value: (U, u) where U[i][j] is the expected number of native
+    two qubit gates from logical qubit i -> j and u[i] counts single qubit
+    gates on i. See demand.demand_builder.
+    """
+    builder = demand_builder.from_dag(dag, num_qubits)
+    return builder.dense()[:num_qubits, :num_qubits], builder.u[:num_qubits]
+
+
+def placement_cost(vertex_map, U, u, l1, l2):
+    """
+    -ln of the estimated circuit fidelity under vertex_map (logical ->
+    physical): sum of U(e) * -ln F(e) over gates plus u(i) * -ln f(i).
+    """
+    perm = np.array([vertex_map[i] for i in range(len(u))])
+    return float((U * l2[np.ix_(perm, perm)]).sum() + u @ l1[perm])
+
+
+def branch_and_bound(U, u, l1, l2, time_budget=None, incumbent=None):
+    """
+    Exact minimum of placement_cost over all injective logical -> physical
+    maps by depth first branch-and-bound.
+
+    Logical qubits are placed in decreasing order of demand. At each node
+    the cost of the placed qubits is carried down, and the remaining cost is
+    bounded below Gilmore-Lawler style: the cost of putting unplaced qubit j
+    on free qubit b is its gates to placed qubits plus half its gates to
+    other unplaced qubits, each priced at the cheapest remaining gates out
+    of b (largest demand on cheapest gate), and the bound is the best
+    assignment of unplaced to free qubits under those costs. If time_budget
+    seconds run out, the best mapping found so far is returned.
+    Return value: (vertex_map, cost, optimal) where optimal is False if the
+    search was cut short
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    n_logical = len(u)
+    n_physical = len(l1)
+    assert n_physical >= n_logical
+
+    W = U + U.T
+    order = list(np.argsort(-(W.sum(axis=1) + u), kind="stable"))
+    # the cheapest gate in either direction between two distinct physical qubits
+    l2_pair = np.minimum(l2, l2.T)
+    np.fill_diagonal(l2_pair, np.inf)
+
+    if incumbent is None:
+        incumbent = {int(q): p for p, q in enumerate(order)}
+    best_map = dict(incumbent)
+    best_cost = placement_cost(best_map, U, u, l1, l2)
+
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    state = {"timed_out": False, "nodes": 0}
+
+    placed = []
+    phys = []
+    free = np.ones(n_physical, dtype=bool)
+
+    def child_costs(j):
+        """
+        Cost of placing logical qubit j on each free physical qubit, given
+        the placed qubits.
+        """
+        cost = u[j] * l1
+        if placed:
+            m = np.array(phys)
+            cost = cost + U[placed, j] @ l2[m, :] + U[j, placed] @ l2[:, m].T
+        return cost
+
+    def lower_bound(depth):
+        rest = order[depth:]
+        if not rest:
+            return 0.0
+        free_idx = np.flatnonzero(free)
+        cost = u[rest][:, None] * l1[free_idx][None, :]
+        if placed:
+            m = np.array(phys)
+            cost = cost + U[np.ix_(placed, rest)].T @ l2[np.ix_(m, free_idx)]
+            cost = cost + U[np.ix_(rest, placed)] @ l2[np.ix_(free_idx, m)].T
+        if len(rest) > 1:
+            # demand to other unplaced qubits, largest first, against each
+            # free qubit's gates to other free qubits, cheapest first
+            weights = -np.sort(-W[np.ix_(rest, rest)], axis=1)[:, : len(rest) - 1]
+            gates = np.sort(l2_pair[np.ix_(free_idx, free_idx)], axis=1)[:, : len(rest) - 1]
+            cost = cost + 0.5 * weights @ gates.T
+        rows, cols = linear_sum_assignment(cost)
+        return cost[rows, cols].sum()
+
+    def search(depth, partial):
+        nonlocal best_cost, best_map
+        if depth == n_logical:
+            if partial < best_cost:
+                best_cost = partial
+                best_map = {int(q): int(p) for q, p in zip(placed, phys)}
+            return
+        state["nodes"] += 1
+        if deadline is not None and state["nodes"] % 64 == 0 and time.monotonic() > deadline:
+            state["timed_out"] = True
+        if state["timed_out"]:
+            return
+
+        j = int(order[depth])
+        costs = child_costs(j)
+        for p in np.argsort(costs):
+            if not free[p]:
+                continue
+            cost = partial + costs[p]
+            if cost >= best_cost:
+                break
+            placed.append(j)
+            phys.append(int(p))
+            free[p] = False
+            if cost + lower_bound(depth + 1) < best_cost:
+                search(depth + 1, cost)
+            free[p] = True
+            phys.pop()
+            placed.pop()
+            if state["timed_out"]:
+                return
+
+    search(0, 0.0)
+    return best_map, float(best_cost), not state["timed_out"]
+
+
+def _padded(U, u, n_physical):
+    """
+    Pads the demand with unused logical qubits so a placement is a full
+    permutation of the physical qubits.
+    """
+    n_logical = len(u)
+    D = np.zeros((n_physical, n_physical))
+    D[:n_logical, :n_logical] = U
+    d = np.zeros(n_physical)
+    d[:n_logical] = u
+    return D, d
+
+
+def swap_deltas(D, d, l1, l2, perm):
+    """
+    Change in placement_cost for swapping the physical qubits of every pair
+    of logical qubits i, j at once, as an n x n matrix.
+    """
+    B = l2[np.ix_(perm, perm)]
+    s = l1[perm]
+    E = D * B
+    DB = D @ B.T
+    DtB = D.T @ B
+    r = np.diag(DB)
+    c = np.diag(DtB)
+    delta = (
+        DB + DB.T - r[:, None] - r[None, :]
+        + DtB + DtB.T - c[:, None] - c[None, :]
+        + E + E.T + D * B.T + D.T * B
+    )
+    delta += (d[:, None] - d[None, :]) * (s[None, :] - s[:, None])
+    np.fill_diagonal(delta, 0.0)
+    return delta
+
+
+def swap_delta(D, d, l1, l2, perm, i, j):
+    """
+    Change in placement_cost for swapping the physical qubits of logical
+    qubits i and j, in O(n).
+    """
+    a, b = perm[i], perm[j]
+    k = np.ones(len(perm), dtype=bool)
+    k[[i, j]] = False
+    pk = perm[k]
+    delta = (D[i, k] - D[j, k]) @ (l2[b, pk] - l2[a, pk])
+    delta += (D[k, i] - D[k, j]) @ (l2[pk, b] - l2[pk, a])
+    delta += D[i, j] * (l2[b, a] - l2[a, b]) + D[j, i] * (l2[a, b] - l2[b, a])
+    delta += (d[i] - d[j]) * (l1[b] - l1[a])
+    return delta
+
+
+def local_search(U, u, l1, l2, vertex_map, mode="best", max_iters=10000, time_budget=None, seed=None):
+    """
+    Pairwise swap local search on placement_cost, starting from vertex_map.
+    Swaps with unused physical qubits are included.
+
+    mode="best" evaluates every swap at once with swap_deltas and takes the
+    best one; mode="first" scans swaps in random order with the O(n)
+    swap_delta and takes the first improving one. Stops when no swap
+    improves the cost, after max_iters swaps or after time_budget seconds.
+    Return value: (vertex_map, cost, converged)
+    """
+    n_logical = len(u)
+    n_physical = len(l1)
+    D, d = _padded(U, u, n_physical)
+    used = [vertex_map[i] for i in range(n_logical)]
+    perm = np.array(used + [p for p in range(n_physical) if p not in set(used)])
+    rng = np.random.default_rng(seed)
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    tol = 1e-12
+
+    converged = False
+    for _ in range(max_iters):
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        if mode == "best":
+            delta = swap_deltas(D, d, l1, l2, perm)
+            i, j = np.unravel_index(np.argmin(delta), delta.shape)
+            if delta[i, j] >= -tol:
+                converged = True
+                break
+        elif mode == "first":
+            pairs = np.transpose(np.triu_indices(n_physical, 1))
+            for i, j in pairs[rng.permutation(len(pairs))]:
+                # swapping two unused qubits changes nothing
+                if i >= n_logical and j >= n_logical:
+                    continue
+                if swap_delta(D, d, l1, l2, perm, i, j) < -tol:
+                    break
+            else:
+                converged = True
+                break
+        else:
+            raise ValueError(f"Unknown mode {mode}")
+        perm[[i, j]] = perm[[j, i]]
+
+    best_map = {i: int(perm[i]) for i in range(n_logical)}
+    return best_map, placement_cost(best_map, U, u, l1, l2), converged
+
+
+def simulated_annealing(U, u, l1, l2, vertex_map, steps=20000, t_start=None, t_end=None,
+                        time_budget=None, seed=None, trace_every=100):
+    """
+    Simulated annealing on placement_cost from vertex_map, proposing random
+    swaps (including moves onto unused physical qubits) priced with the
+    O(n) swap_delta. The temperature falls geometrically from t_start to
+    t_end over steps proposals; by default t_start is the mean size of a
+    random swap's cost change and t_end is 1000 times smaller.
+    Return value: (vertex_map, cost, trace) with the best mapping seen and
+    the best cost after every trace_every proposals
+    """
+    n_logical = len(u)
+    n_physical = len(l1)
+    D, d = _padded(U, u, n_physical)
+    used = [vertex_map[i] for i in range(n_logical)]
+    perm = np.array(used + [p for p in range(n_physical) if p not in set(used)])
+    rng = np.random.default_rng(seed)
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    def random_pair():
+        i = int(rng.integers(n_logical))
+        j = int(rng.integers(n_physical - 1))
+        return i, j + (j >= i)
+
+    if t_start is None:
+        sample = [abs(swap_delta(D, d, l1, l2, perm, *random_pair())) for _ in range(50)]
+        t_start = max(float(np.mean(sample)), 1e-9)
+    if t_end is None:
+        t_end = t_start * 1e-3
+    cooling = (t_end / t_start) ** (1 / max(steps - 1, 1))
+
+    cost = placement_cost(vertex_map, U, u, l1, l2)
+    best_cost = cost
+    best_perm = perm.copy()
+    trace = []
+    temperature = t_start
+    for step in range(steps):
+        i, j = random_pair()
+        delta = swap_delta(D, d, l1, l2, perm, i, j)
+        if delta < 0 or rng.random() < np.exp(-delta / temperature):
+            perm[[i, j]] = perm[[j, i]]
+            cost += delta
+            if cost < best_cost:
+                best_cost = cost
+                best_perm = perm.copy()
+        temperature *= cooling
+        if step % trace_every == 0:
+            trace.append(float(best_cost))
+            if deadline is not None and time.monotonic() > deadline:
+                break
+    trace.append(float(best_cost))
+
+    best_map = {i: int(best_perm[i]) for i in range(n_logical)}
+    return best_map, placement_cost(best_map, U, u, l1, l2), trace
+
+
+def multistart_annealing(U, u, l1, l2, starts, restarts=8, max_workers=None, seed=None, **kwargs):
+    """
+    Runs restarts independent simulated_annealing chains on a process
+    pool, cycling through the vertex maps in starts as initial mappings.
+    Extra keyword arguments go to simulated_annealing.
+    Return value: (vertex_map, cost, trace) of the best chain
+    """
+    seeds = np.random.SeedSequence(seed).spawn(restarts)
+    jobs = [
+        (U, u, l1, l2, starts[k % len(starts)])
+        for k in range(restarts)
+    ]
+    if max_workers == 1:
+        results = [
+            simulated_annealing(*job, seed=chain_seed, **kwargs)
+            for job, chain_seed in zip(jobs, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(simulated_annealing, *job, seed=chain_seed, **kwargs)
+                for job, chain_seed in zip(jobs, seeds)
+            ]
+            results = [future.result() for future in futures]
+    return min(results, key=lambda result: result[1])
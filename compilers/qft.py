@@ -1,16 +1,15 @@
-# Use Braket SDK Cost Tracking to estimate the cost to run this example
-from braket.tracking import Tracker
-t = Tracker().start()
-
-from braket.aws import AwsDevice
-from braket.circuits import Circuit, gates, noises, observables
-from braket.devices import LocalSimulator
-from braket.parametric import FreeParameter
+from braket.circuits import Circuit
 import numpy as np
-from scipy.stats import unitary_group
 import math
 
-def qft(n, arr):
+def qft(n, arr, max_degree=None):
+    """
+    QFT on n qubits after X on every set bit of arr. With max_degree set,
+    controlled rotations by 2*pi/2^j for j > max_degree are left out
+    (the approximate QFT).
+    """
+    if max_degree is None:
+        max_degree = n
     circuit = Circuit()
     
     for i in range(len(arr)):
@@ -19,7 +18,7 @@ def qft(n, arr):
     
     for i in range(0, n):
         circuit.h(i)
-        for j in range(1, n - i):
+        for j in range(1, min(n - i, max_degree + 1)):
             circuit.cphaseshift(i+j,i,(2 * np.pi / math.pow(2,j)))
 
     return circuit
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+def coupling_matrix(coupling, num_qubits):
+    """
+    Boolean adjacency matrix of an undirected coupling graph given as a list
+    of physical qubit pairs
+    """
+    adjacent = np.zeros((num_qubits, num_qubits), dtype=bool)
+    for a, b in coupling:
+        adjacent[a, b] = adjacent[b, a] = True
+    return adjacent
+
+
+def grid_coupling(rows, cols):
+    """
+    Edges of a rows x cols grid, qubit r*cols + c at row r, column c
+    """
+    edges = []
+    for r in range(rows):
+        for c in range(cols):
+            q = r * cols + c
+            if c + 1 < cols:
+                edges.append((q, q + 1))
+            if r + 1 < rows:
+                edges.append((q, q + cols))
+    return edges
+
+
+def swap_costs(adjacent, two_qubit_fidelity):
+    """
+    -ln of the fidelity of a SWAP (three CNOTs, in whichever direction is
+    better) on every coupled pair, inf on uncoupled pairs
+    """
+    f = np.clip(np.asarray(two_qubit_fidelity, dtype=float), 1e-12, 1.0)
+    f = np.maximum(f, f.T)
+    return np.where(adjacent, -3 * np.log(f), np.inf)
+
+
+def most_reliable_paths(adjacent, two_qubit_fidelity):
+    """
+    Floyd-Warshall on the SWAP costs, one vectorized relaxation per
+    intermediate qubit.
+    Return value: (D, hops) where D[a][b] is the smallest accumulated -ln F
+    of moving a qubit from a to b, and hops[a][b] the number of edges on
+    the shortest path from a to b
+    """
+    n = len(adjacent)
+    D = swap_costs(adjacent, two_qubit_fidelity)
+    hops = np.where(adjacent, 1.0, np.inf)
+    np.fill_diagonal(D, 0.0)
+    np.fill_diagonal(hops, 0.0)
+    for k in range(n):
+        D = np.minimum(D, D[:, k, None] + D[None, k, :])
+        hops = np.minimum(hops, hops[:, k, None] + hops[None, k, :])
+    return D, hops
+
+
+def route(circuit, coupling, two_qubit_fidelity, initial_layout=None, lookahead=20,
+          lookahead_weight=0.5):
+    """
+    SABRE-style SWAP insertion for a device with restricted connectivity.
+    Gates run in circuit order. Before each two qubit gate on uncoupled
+    qubits, SWAPs are added one at a time, each chosen among the SWAPs that
+    bring the gate's qubits closer by the cost of the SWAP plus the most
+    reliable path cost of the gate and (weighted) of the next lookahead two
+    qubit gates. Each gate costs O(degree * lookahead), so routing is
+    linear in circuit length.
+    coupling is a list of physical qubit pairs; initial_layout maps logical
+    -> physical (identity by default).
+    Return value: (routed circuit on physical qubits, final layout, number
+    of SWAPs added)
+    """
+    from braket.circuits import Circuit, Instruction, gates
+
+    from compilers.instruction_rewrite import rewrite_instruction
+
+    n = len(two_qubit_fidelity)
+    adjacent = coupling_matrix(coupling, n)
+    cost = swap_costs(adjacent, two_qubit_fidelity)
+    D, hops = most_reliable_paths(adjacent, two_qubit_fidelity)
+    neighbours = [np.flatnonzero(adjacent[p]) for p in range(n)]
+
+    instructions = list(circuit.instructions)
+    num_logical = max((int(q) for q in circuit.qubits), default=-1) + 1
+    if num_logical > n:
+        raise ValueError(f"circuit uses {num_logical} qubits, the device has {n}")
+    if initial_layout is None:
+        initial_layout = range(num_logical)
+    layout = np.array([initial_layout[q] for q in range(num_logical)], dtype=np.int64)
+    owner = np.full(n, -1, dtype=np.int64)
+    owner[layout] = np.arange(num_logical)
+
+    # logical qubits of every two qubit gate, in order, for the lookahead
+    two_qubit = [k for k, inst in enumerate(instructions) if len(inst.target) + len(inst.control) == 2]
+    pairs = np.array(
+        [[int(q) for q in list(instructions[k].control) + list(instructions[k].target)] for k in two_qubit],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    routed = []
+    mapping = None
+    num_swaps = 0
+    next_pair = 0
+    for inst in instructions:
+        qubits = [int(q) for q in list(inst.control) + list(inst.target)]
+        if len(qubits) > 2:
+            a_phys = layout[qubits]
+            if not all(adjacent[p, q] for i, p in enumerate(a_phys) for q in a_phys[i + 1:]):
+                raise ValueError("gates on more than two qubits must be decomposed before routing")
+        if len(qubits) == 2:
+            window = pairs[next_pair + 1:next_pair + 1 + lookahead]
+            next_pair += 1
+            a, b = qubits
+            if not np.isfinite(hops[layout[a], layout[b]]):
+                raise ValueError("coupling graph does not connect the qubits of a gate")
+            while not adjacent[layout[a], layout[b]]:
+                best = None
+                for moving in (a, b):
+                    p = layout[moving]
+                    other = layout[b if moving == a else a]
+                    for q in neighbours[p]:
+                        if hops[q, other] >= hops[p, other]:
+                            continue
+                        # score the layout with physical p and q swapped in
+                        # place, then swap them back
+                        displaced = owner[q]
+                        layout[moving] = q
+                        if displaced >= 0:
+                            layout[displaced] = p
+                        score = cost[p, q] + D[layout[a], layout[b]]
+                        if len(window):
+                            score += lookahead_weight * D[layout[window[:, 0]], layout[window[:, 1]]].mean()
+                        layout[moving] = p
+                        if displaced >= 0:
+                            layout[displaced] = q
+                        if best is None or score < best[0]:
+                            best = (score, p, q)
+                _, p, q = best
+                moved = owner[p], owner[q]
+                owner[p], owner[q] = moved[1], moved[0]
+                for logical, physical in zip(moved, (q, p)):
+                    if logical >= 0:
+                        layout[logical] = physical
+                routed.append(Instruction(gates.Swap(), [int(p), int(q)]))
+                num_swaps += 1
+                mapping = None
+        if mapping is None:
+            mapping = layout.tolist()
+        routed.append(rewrite_instruction(inst, mapping))
+    return Circuit(routed), layout.tolist(), num_swaps
@@ -0,0 +1,177 @@
+from collections import deque
+import math
+
+from braket.circuits import Circuit, Instruction, gates
+from braket.parametric import FreeParameterExpression
+
+from compilers.demand import demand_builder
+from compilers.gate_cancellation import (
+    INVERSE_PAIRS,
+    ROTATION_PERIODS,
+    ROTATIONS,
+    SELF_INVERSE,
+    _is_zero_angle,
+    _same_targets,
+)
+from compilers.instruction_rewrite import GATE_TYPES, rewrite_instruction
+
+
+# Generator passes over instruction streams. Each pass takes an iterable of
+# Instructions and lazily yields Instructions, holding at most a bounded
+# window of them, so passes compose without building intermediate circuits
+# and memory stays flat in circuit length. Only a sink materializes.
+
+
+def instructions_of(circuit):
+    return iter(circuit.instructions)
+
+
+def pipeline(stream, *passes):
+    """
+    Chains passes (each a function stream -> stream) onto stream
+    """
+    for stage in passes:
+        stream = stage(stream)
+    return stream
+
+
+def relabel(stream, vertex_map):
+    """
+    reshape as a pass: every qubit sent through vertex_map
+    """
+    for inst in stream:
+        yield rewrite_instruction(inst, vertex_map)
+
+
+def invert_angles(stream):
+    """
+    ibm_compile as a pass: every angle negated
+    """
+    for inst in stream:
+        yield rewrite_instruction(inst, invert=True)
+
+
+def _is_plain(inst):
+    # gates with free parameters are barriers, as in circuit_dag: their
+    # angles cannot be merged or tested for zero
+    return (
+        type(inst.operator) in GATE_TYPES
+        and not inst.control
+        and inst.power == 1
+        and not any(isinstance(p, FreeParameterExpression) for p in getattr(inst.operator, "parameters", []))
+    )
+
+
+def cancel(stream, window=1024, atol=1e-9):
+    """
+    gate_cancellation as a pass, with the same rules: identities are
+    dropped, adjacent inverse pairs removed and adjacent rotations merged.
+    Up to window instructions are held back so that a cancellation can
+    expose earlier gates to the next one; older instructions are emitted
+    and can no longer cancel.
+    """
+    # pending entries are [instruction, alive]; wires[q] holds the pending
+    # entries on qubit q, oldest first
+    pending = deque()
+    wires = {}
+
+    def flush(keep):
+        while len(pending) > keep:
+            entry = pending.popleft()
+            if not entry[1]:
+                continue
+            for q in entry[0].target:
+                wires[int(q)].popleft()
+            yield entry[0]
+
+    def kill(entry):
+        entry[1] = False
+        for q in entry[0].target:
+            wires[int(q)].pop()
+
+    for inst in stream:
+        if not _is_plain(inst):
+            # barrier on its wires: flush everything so order is kept
+            yield from flush(0)
+            yield inst
+            continue
+        name = inst.operator.name
+        if name == "I":
+            continue
+
+        targets = [int(q) for q in inst.target]
+        tops = [wires[q][-1] if wires.get(q) else None for q in targets]
+        prev = tops[0]
+        if prev is not None and all(top is prev for top in tops) and len(prev[0].target) == len(targets):
+            prev_inst = prev[0]
+            prev_name = prev_inst.operator.name
+            prev_targets = [int(q) for q in prev_inst.target]
+            if (prev_name == name and name in SELF_INVERSE) or (prev_name, name) in INVERSE_PAIRS:
+                if _same_targets(name, prev_targets, targets):
+                    kill(prev)
+                    continue
+            elif prev_name == name and name in ROTATIONS and _same_targets(name, prev_targets, targets):
+                angle = prev_inst.operator.angle + inst.operator.angle
+                if _is_zero_angle(angle, atol, ROTATION_PERIODS.get(name, 2 * math.pi)):
+                    kill(prev)
+                else:
+                    prev[0] = Instruction(type(inst.operator)(angle), prev_inst.target)
+                continue
+
+        entry = [inst, True]
+        pending.append(entry)
+        for q in targets:
+            wires.setdefault(q, deque()).append(entry)
+        yield from flush(window)
+
+    yield from flush(0)
+
+
+def stream_demand(stream, num_qubits=0):
+    """
+    Demand of a stream for the placement passes, built one instruction at
+    a time. See demand.demand_builder.
+    """
+    builder = demand_builder(num_qubits)
+    builder.add_instructions(stream)
+    return builder
+
+
+def to_circuit(stream):
+    return Circuit(stream)
+
+
+def write_openqasm(stream, f):
+    """
+    Writes the stream to the file object f as OpenQASM 3 on physical
+    qubits, one line per gate. Noise and modified gates are not supported.
+    """
+    f.write("OPENQASM 3.0;\n")
+    for inst in stream:
+        if not _is_plain(inst):
+            raise ValueError(f"cannot write {inst.operator.name} as OpenQASM")
+        operator = inst.operator
+        qubits = ", ".join(f"${int(q)}" for q in inst.target)
+        if isinstance(operator, gates.AngledGate):
+            f.write(f"{operator.name.lower()}({operator.angle!r}) {qubits};\n")
+        else:
+            f.write(f"{operator.name.lower()} {qubits};\n")
+
+
+def main():
+    # parametric rotations pass through cancel untouched, plain ones merge
+    from braket.parametric import FreeParameter
+
+    theta = FreeParameter("theta")
+    parametric = Circuit().rx(0, theta).rx(0, theta)
+    kept = to_circuit(cancel(instructions_of(parametric)))
+    status = "ok" if kept == parametric else "changed"
+    print(f"cancel parametric Rx pair: {len(kept.instructions)} gates {status}")
+
+    merged = to_circuit(cancel(instructions_of(Circuit().rx(0, 0.25).rx(0, 0.5))))
+    status = "ok" if len(merged.instructions) == 1 and merged.instructions[0].operator.angle == 0.75 else "not merged"
+    print(f"cancel plain Rx pair: {len(merged.instructions)} gates {status}")
+
+
+if __name__ == "__main__":
+    main()
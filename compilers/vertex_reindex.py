@@ -1,12 +1,15 @@
-from braket.aws import AwsDevice
-from braket.circuits import Circuit, gates, noises, observables
-from braket.devices import LocalSimulator
-from braket.parametric import FreeParameter
 import numpy as np
-from scipy.stats import unitary_group
 from queue import PriorityQueue
-import math
-import random
+
+from compilers.demand import demand_builder
+from compilers.placement import (
+    branch_and_bound,
+    demand_matrices,
+    local_search,
+    log_fidelities,
+    multistart_annealing,
+    placement_cost,
+)
 
 # import sys 
 # sys.path.append('../')
@@ -16,14 +19,17 @@ import random
 # from simulating_noise import noise_model
 
 
+def _as_dag(circuit):
+    # circuit_dag needs the Braket SDK, so it is only loaded once a circuit
+    # is compiled; the placement heuristics below need NumPy alone
+    from compilers.circuit_dag import circuit_dag
+    return circuit if isinstance(circuit, circuit_dag) else circuit_dag.from_circuit(circuit)
+
 def reorder_overall_v1(circuit, num_qubits, single_fidelities, two_qubit_fidelities):
     # Read through circuit instructions and look for instances of CNOT, and use them to 
     # generate the demand matrix
-    demand = [[0 for i in range(0, num_qubits)] for j in range(0, num_qubits)]
-    for row in circuit.instructions:
-        if row.operator.name == "CPhaseShift" or row.operator.name == "CNot":
-            # print(row)
-            demand[row.target[0]][row.target[1]] += 1
+    dag = _as_dag(circuit)
+    demand = demand_builder.from_dag(dag, num_qubits).dense()
 
     if False: 
         v_f = fidelities
@@ -31,19 +37,28 @@ def reorder_overall_v1(circuit, num_qubits, single_fidelities, two_qubit_fidelit
     
     # print(vertex_map)
 
-    return reshape(circuit, vertex_map)
+    return reshape(dag, vertex_map)
 
 def reorder_overall(circuit, num_qubits, qubit_fidelities, gate_fidelities):
-    edges = [set() for _ in range(num_qubits)]
-
-    demand = [0]*num_qubits
-
-    for row in circuit.instructions:
-        if row.operator.name == "CPhaseShift" or row.operator.name == "CNot":
-            # print(row)
-            # demand[row.target[0]][row.target[1]] += 1
-            demand[row.target[0]] += 1
-            edges[row.target[0]].add(row.target[1])
+    dag = _as_dag(circuit)
+    vertex_map = overall_vertex_map(dag, num_qubits, qubit_fidelities, gate_fidelities)
+    return reshape(dag, vertex_map)
+
+def overall_vertex_map(dag, num_qubits, qubit_fidelities, gate_fidelities):
+    """
+    The reorder_overall placement: put the logical qubit with the most
+    gates on the best physical qubit, then grow outwards along its gates,
+    always taking the best remaining gate fidelity next.
+    """
+    qubit_fidelities = list(qubit_fidelities)
+    builder = demand_builder.from_dag(dag, num_qubits)
+    if builder.num_qubits > num_qubits:
+        # the builder grows to fit the circuit; qubits past the device would
+        # be left out of vertex_map
+        raise ValueError(f"circuit uses {builder.num_qubits} qubits, the device has {num_qubits}")
+    edges = builder.edges()
+
+    demand = builder.dense().sum(axis=1).tolist()
 
     vertex_map = {}
     
@@ -53,8 +68,13 @@ def reorder_overall(circuit, num_qubits, qubit_fidelities, gate_fidelities):
     cnt = 0
 
     while cnt < num_qubits:
-        qubit_logic_indemand = demand.index(max(demand))
-        best_qubit = qubit_fidelities.index(max(qubit_fidelities))
+        # Start each component from the unplaced qubits only
+        qubit_logic_indemand = max(
+            (i for i in range(num_qubits) if not found_goal[i]), key=lambda i: demand[i]
+        )
+        best_qubit = max(
+            (i for i in range(num_qubits) if not found_target[i]), key=lambda i: qubit_fidelities[i]
+        )
 
         cnt += 1
         found_goal[qubit_logic_indemand] = 1
@@ -65,7 +85,7 @@ def reorder_overall(circuit, num_qubits, qubit_fidelities, gate_fidelities):
         pq = PriorityQueue()
 
         for i in range(num_qubits):
-            if i == best_qubit:
+            if found_target[i]:
                 continue
             # gate weight, goal qubit, target qubit
             pq.put((-gate_fidelities[best_qubit][i], (qubit_logic_indemand, i)))
@@ -88,102 +108,121 @@ def reorder_overall(circuit, num_qubits, qubit_fidelities, gate_fidelities):
                     pq.put((-gate_fidelities[target][i], (adj, i)))
                 break
 
-    return reshape(circuit, vertex_map)
+    return vertex_map
 
 
-def reshape(circuit, vertex_map):
-    new_circuit = Circuit()
-    for row in circuit.instructions:
-        # print(row)
-        # print(row.target[0])
-
-        op_name = row.operator.name
-        try: 
-            target = [vertex_map[row.target[0]], vertex_map[row.target[1]]]
-        except:
-            target = vertex_map[row.target[0]]
-
-        # print(target)
-        # print(op_name)
-
-        if op_name == "H":
-            new_circuit.h(target)
-        elif op_name == "I":
-            new_circuit.i(target)
-        elif op_name == "X":
-            new_circuit.x(target)
-        elif op_name == "Y":
-            new_circuit.y(target)
-        elif op_name == "Z":
-            new_circuit.z(target)
-        elif op_name == "S":
-            new_circuit.s(target)
-        elif op_name == "Si":
-            new_circuit.si(target)
-        elif op_name == "T":
-            new_circuit.t(target)
-        elif op_name == "Ti":
-            new_circuit.ti(target)
-        elif op_name == "V":
-            new_circuit.v(target)
-        elif op_name == "V":
-            new_circuit.vi(target)
-        elif op_name == "Rx":
-            new_circuit.rx(target, -row.operator.anglegle)
-        elif op_name == "Ry":
-            new_circuit.ry(target, -row.operator.angle)
-        elif op_name == "Rz":
-            new_circuit.rz(target, -row.operator.angle)
-        elif op_name == "PhaseShift":
-            new_circuit.phaseshift(target, -row.operator.angle)
-        elif op_name == "CNot":
-            new_circuit.cnot(*target)
-        elif op_name == "Swap":
-            new_circuit.swap(*target)
-        elif op_name == "ISwap":
-            new_circuit.iswap(*target, -np.pi / 2)
-        elif op_name == "PSwap":
-            new_circuit.pswap(*target, -row.operator.angle)
-        elif op_name == "XY":
-            new_circuit.xy(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift":
-            new_circuit.cphaseshift(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift00":
-            new_circuit.cphaseshift00(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift01":
-            new_circuit.cphaseshift01(*target, -row.operator.angle)
-        elif op_name == "CPhaseShift10":
-            new_circuit.cphaseshift10(*target, -row.operator.angle)
-        elif op_name == "CY":
-            new_circuit.cy(*target)
-        elif op_name == "CZ":
-            new_circuit.cz(*target)
-        elif op_name == "XX":
-            new_circuit.xx(*target, -row.operator.angle)
-        elif op_name == "YY":
-            new_circuit.yy(*target, -row.operator.angle)
-        elif op_name == "ZZ":
-            new_circuit.zz(*target, -row.operator.angle)
-        elif op_name == "CCNot":
-            new_circuit.ccnot(*target)
-        elif op_name == "CSwap":
-            new_circuit.cswap(*target)           
-
-        # if "CPhaseShift" in str(row.operator):
-        #     print("hi")
-        #     new_circuit.cnot(vertex_map[row.target[0]], vertex_map[row.target[1]])
-        # else:
-        #     new_circuit += row
+def exact_vertex_map(dag, num_qubits, qubit_fidelities, gate_fidelities, time_budget=10.0):
+    """
+    Optimal vertex map for the README objective by branch-and-bound, seeded
+    with the GreedyV mapping. Falls back to the best mapping found when
+    time_budget seconds run out.
+    Return value: (vertex_map, cost, optimal, greedy_cost) where cost is the
+    -ln fidelity estimate of vertex_map, optimal says whether the search
+    finished and greedy_cost is the same estimate for the GreedyV mapping
+    """
+    U, u = demand_matrices(dag, num_qubits)
+    l1, l2 = log_fidelities(qubit_fidelities, gate_fidelities)
+    greedy_map = GreedyV(U, list(qubit_fidelities))
+    greedy_cost = placement_cost(greedy_map, U, u, l1, l2)
+    vertex_map, cost, optimal = branch_and_bound(
+        U, u, l1, l2, time_budget=time_budget, incumbent=greedy_map
+    )
+    return vertex_map, cost, optimal, greedy_cost
+
+def reorder_exact(circuit, num_qubits, qubit_fidelities, gate_fidelities, time_budget=10.0):
+    """
+    reorder_overall, but with the exact placement from exact_vertex_map.
+    """
+    dag = _as_dag(circuit)
+    vertex_map, _, _, _ = exact_vertex_map(
+        dag, num_qubits, qubit_fidelities, gate_fidelities, time_budget
+    )
+    return reshape(dag, vertex_map)
+
+
+def annealed_vertex_map(dag, num_qubits, qubit_fidelities, gate_fidelities,
+                        restarts=8, max_workers=None, seed=None, **kwargs):
+    """
+    Vertex map from multistart simulated annealing on the README objective,
+    with chains started from the GreedyV, GreedyE and GreedySwap mappings.
+    Extra keyword arguments go to placement.simulated_annealing.
+    Return value: (vertex_map, cost, trace) where trace is the best cost
+    over the course of the winning chain
+    """
+    U, u = demand_matrices(dag, num_qubits)
+    l1, l2 = log_fidelities(qubit_fidelities, gate_fidelities)
+    starts = [
+        GreedyV(U, list(qubit_fidelities)),
+        GreedyE(U, gate_fidelities, qubit_fidelities),
+        GreedySwap(u, U, qubit_fidelities, gate_fidelities),
+    ]
+    return multistart_annealing(
+        U, u, l1, l2, starts,
+        restarts=restarts, max_workers=max_workers, seed=seed, **kwargs,
+    )
+
+def reorder_annealed(circuit, num_qubits, qubit_fidelities, gate_fidelities, **kwargs):
+    """
+    reorder_overall, but with the placement from annealed_vertex_map.
+    """
+    dag = _as_dag(circuit)
+    vertex_map, _, _ = annealed_vertex_map(
+        dag, num_qubits, qubit_fidelities, gate_fidelities, **kwargs
+    )
+    return reshape(dag, vertex_map)
 
-    # print("New Circuit")
-    # print(new_circuit)
-    # for row in new_circuit.instructions:
-    #     print(row)
 
-    return new_circuit
+def reshape(circuit, vertex_map):
+    """
+    Relabels every qubit of circuit through vertex_map (logical -> physical).
+    circuit may be a Circuit or a circuit_dag; a circuit_dag is relabelled
+    in place and lowered to the returned Circuit.
+    """
+    dag = _as_dag(circuit)
+    dag.relabel(vertex_map)
+    return dag.to_circuit()
+
+def GreedyE(two_qubit_demand, two_qubit_fid, vertex_fid=None):
+    """
+    Ranks each pair of logical qubits by the number of gates between them
+    and assigns them, in that order, to the free physical qubits with the
+    best gate fidelity. Qubits without two qubit gates go to the best
+    remaining physical qubits by vertex_fid.
+    """
+    U = np.asarray(two_qubit_demand, dtype=float)
+    F = np.asarray(two_qubit_fid, dtype=float).copy()
+    np.fill_diagonal(F, -np.inf)
+    n_logical = len(U)
+    n_physical = len(F)
+    assert n_physical >= n_logical
 
-def GreedyE():
-    pass
+    vertex_map = {}
+    free = np.ones(n_physical, dtype=bool)
+    pairs = np.argwhere(U > 0)
+    for i, j in pairs[np.argsort(-U[U > 0], kind="stable")]:
+        i, j = int(i), int(j)
+        if i in vertex_map and j in vertex_map:
+            continue
+        if i in vertex_map or j in vertex_map:
+            # place the missing end next to the one already placed
+            if i in vertex_map:
+                row = np.where(free, F[vertex_map[i], :], -np.inf)
+                vertex_map[j] = int(np.argmax(row))
+            else:
+                col = np.where(free, F[:, vertex_map[j]], -np.inf)
+                vertex_map[i] = int(np.argmax(col))
+        else:
+            open_pairs = np.where(np.outer(free, free), F, -np.inf)
+            a, b = np.unravel_index(np.argmax(open_pairs), F.shape)
+            vertex_map[i], vertex_map[j] = int(a), int(b)
+        free[vertex_map[i]] = free[vertex_map[j]] = False
+
+    ranking = np.argsort(-np.asarray(vertex_fid if vertex_fid is not None else np.zeros(n_physical)), kind="stable")
+    remaining = [int(p) for p in ranking if free[p]]
+    for i in range(n_logical):
+        if i not in vertex_map:
+            vertex_map[i] = remaining.pop(0)
+    return vertex_map
 
 def GreedyV(demand, vertex_fid):
     assert len(vertex_fid) >= len(demand)
@@ -205,29 +244,25 @@ def GreedyV(demand, vertex_fid):
     
     return vertex_map
 
-def GreedySwap(vertex_demand, two_qubit_demand, vertex_fid, two_qubit_fid):
+def GreedySwap(vertex_demand, two_qubit_demand, vertex_fid, two_qubit_fid,
+               mode="best", max_iters=10000, time_budget=None, seed=None):
+    """
+    Starts from the GreedyE mapping and repeatedly swaps the physical qubits
+    of two logical qubits (or moves one onto an unused physical qubit)
+    while that lowers -ln of the estimated fidelity. See
+    placement.local_search for mode, max_iters and time_budget.
+    Return value: vertex_map (logical -> physical)
+    """
     assert len(vertex_fid) >= len(vertex_demand)
-    vertex_map = GreedyE(vertex_demand, vertex_fid)
-
-    # Repeat the swapping process until no improvement is possible
-    while True:
-        # Choose a random edge
-        i, j = random.choice(list(vertex_map.items()))
-
-        # Compare the net change in ln(fidelity) usage
-        swap_qubit_delta = 0
-        swap_qubit_delta += vertex_demand["initial"][i] * vertex_fid[vertex_map[i]] + vertex_demand["initial"][j] * two_qubit_fid[i][vertex_map[j]]
-        swap_qubit_delta -= vertex_demand["initial"][i] * vertex_fid[vertex_map[j]] + vertex_demand["initial"][j] * two_qubit_fid[i][vertex_map[i]]
-
-        for k in range(0, len(vetex_demand)):
-            if k in vertex_map:
-                swap_qubit_delta += two_qubit_demand[k][i] * two_qubit_fid[k][vertex_map[i]] + two_qubit_demand[k][j] * two_qubit_fid[k][vertex_map[j]]
-                swap_qubit_delta -= two_qubit_demand[k][i] * two_qubit_fid[k][vertex_map[j]] + two_qubit_demand[k][j] * two_qubit_fid[k][vertex_map[i]]
-
-        if (swap_qubit_delta < 0):
-            # Swap the qubits
-            vertex_map[i], vertex_map[j] = vertex_map[j], vertex_map[i]
-
+    U = np.asarray(two_qubit_demand, dtype=float)
+    u = np.asarray(vertex_demand, dtype=float)
+    l1, l2 = log_fidelities(vertex_fid, two_qubit_fid)
+    vertex_map = GreedyE(U, two_qubit_fid, vertex_fid)
+
+    vertex_map, _, _ = local_search(
+        U, u, l1, l2, vertex_map,
+        mode=mode, max_iters=max_iters, time_budget=time_budget, seed=seed,
+    )
     return vertex_map
 
 # def calculate_value(demand, vertex_fid, two_qubit_fid, vertex_map):
@@ -0,0 +1,218 @@
+"""
+Small noisy circuits simulated directly on a NumPy density matrix.
+
+Each gate is fused with the noise channels that follow it into one
+superoperator on the gate's qubits, so a gate and its noise cost a single
+tensordot on the affected axes of the density matrix. Superoperators are
+cached by gate, parameters and noise, so repeated gates are built once.
+"""
+from collections import Counter
+
+from braket.circuits import Circuit, gates, noises
+from braket.circuits.noise import Noise
+import numpy as np
+
+from noise_index import noise_index
+
+
+def _operator_key(operator):
+    if isinstance(operator, (gates.Unitary, noises.Kraus)):
+        # matrices are not hashable; these are only cached per object
+        return ("id", id(operator))
+    params = tuple(float(p) for p in getattr(operator, "parameters", []))
+    return (type(operator).__name__, params)
+
+
+def _apply_kraus(tensor, kraus, rows, cols):
+    """
+    sum_K K tensor K^dagger, with K acting on the row axes rows and K^* on
+    the column axes cols of tensor.
+    """
+    m = len(rows)
+    out = 0
+    for K in kraus:
+        K = K.reshape((2,) * (2 * m))
+        t = np.tensordot(K, tensor, axes=(list(range(m, 2 * m)), rows))
+        t = np.moveaxis(t, list(range(m)), rows)
+        t = np.tensordot(K.conj(), t, axes=(list(range(m, 2 * m)), cols))
+        t = np.moveaxis(t, list(range(m)), cols)
+        out = out + t
+    return out
+
+
+def fused_superoperator(gate, channels, k):
+    """
+    Superoperator of gate followed by each (noise, positions) channel on a
+    k qubit register, as a tensor with axes (out rows, out cols, in rows,
+    in cols), k axes each. positions are the noise's qubits as indices
+    into the gate's targets.
+    """
+    dim = 2**k
+    S = np.eye(dim * dim, dtype=complex).reshape((2,) * (4 * k))
+    rows = list(range(k))
+    cols = list(range(k, 2 * k))
+    if gate is not None:
+        S = _apply_kraus(S, [gate.to_matrix()], rows, cols)
+    for noise, positions in channels:
+        S = _apply_kraus(
+            S, noise.to_matrix(), [rows[p] for p in positions], [cols[p] for p in positions]
+        )
+    return S
+
+
+class dm_result:
+    """
+    Result of a density_matrix_simulator run. probabilities[i] is the exact
+    probability of basis state i over measured_qubits (first qubit most
+    significant, as in Braket), and measurement_counts the sampled shots.
+    """
+
+    def __init__(self, probabilities, measured_qubits, measurement_counts):
+        self.probabilities = probabilities
+        self.measured_qubits = measured_qubits
+        self.measurement_counts = measurement_counts
+
+    def result(self):
+        return self
+
+
+class dm_batch:
+    def __init__(self, results):
+        self._results = results
+
+    def results(self):
+        return self._results
+
+
+class density_matrix_simulator:
+    """
+    Drop in for LocalSimulator('braket_dm') on small circuits. Circuits can
+    already contain noise instructions (as produced by NoiseModel.apply),
+    or the simulator can be given a noise_model to resolve the channels of
+    each gate itself.
+    """
+
+    name = "FusedDensityMatrixSimulator"
+
+    def __init__(self, noise_model=None, seed=None):
+        self.noise_model = noise_model
+        self.rng = np.random.default_rng(seed)
+        self._superoperators = {}
+        self._noise_for = {}
+        self._boundary_for = {}
+        self._index = None if noise_model is None else noise_index(noise_model)
+
+    def gate_noise(self, instruction):
+        """
+        Noise channels the noise model attaches to instruction, as a list of
+        (noise, positions in the instruction's targets). Resolved once per
+        gate type and target qubits.
+        """
+        key = (type(instruction.operator), tuple(int(q) for q in instruction.target))
+        try:
+            return self._noise_for[key]
+        except KeyError:
+            pass
+        channels = []
+        if self._index is not None:
+            targets = list(key[1])
+            for noise, qubits in self._index.gate_noise(instruction):
+                channels.append((noise, [targets.index(int(q)) for q in qubits]))
+        self._noise_for[key] = channels
+        return channels
+
+    def boundary_noise(self, measured):
+        """
+        Noise channels the noise model applies at the start and before
+        measuring the qubits measured, as two lists of (noise, qubits).
+        Resolved once per register.
+        """
+        key = tuple(measured)
+        try:
+            return self._boundary_for[key]
+        except KeyError:
+            pass
+        channels = [], []
+        if self._index is not None:
+            circ = Circuit()
+            for q in key:
+                circ.i(q)
+            for found, instructions in zip(channels, self._index.boundary_noise(circ)):
+                found.extend((inst.operator, [int(q) for q in inst.target]) for inst in instructions)
+        self._boundary_for[key] = channels
+        return channels
+
+    def fused_groups(self, circuit):
+        """
+        Splits a circuit into (gate, channels, qubits) groups: each gate
+        with the noise after it that acts only on the gate's qubits. Noise
+        anywhere else becomes a group of its own with gate None.
+        """
+        measured = sorted(int(q) for q in circuit.qubits)
+        initialization, readout = self.boundary_noise(measured)
+        groups = [(None, [(noise, list(range(len(qubits))))], qubits) for noise, qubits in initialization]
+        for inst in circuit.instructions:
+            qubits = [int(q) for q in inst.target]
+            if isinstance(inst.operator, Noise):
+                if groups and set(qubits) <= set(groups[-1][2]):
+                    last_qubits = groups[-1][2]
+                    groups[-1][1].append((inst.operator, [last_qubits.index(q) for q in qubits]))
+                else:
+                    groups.append((None, [(inst.operator, list(range(len(qubits))))], qubits))
+                continue
+            groups.append((inst.operator, list(self.gate_noise(inst)), qubits))
+        for noise, qubits in readout:
+            groups.append((None, [(noise, list(range(len(qubits))))], qubits))
+        return groups
+
+    def superoperator(self, gate, channels, k):
+        key = (
+            k,
+            None if gate is None else _operator_key(gate),
+            tuple((_operator_key(noise), tuple(pos)) for noise, pos in channels),
+        )
+        try:
+            return self._superoperators[key]
+        except KeyError:
+            S = self._superoperators[key] = fused_superoperator(gate, channels, k)
+            return S
+
+    def density_matrix(self, circuit):
+        """
+        Return value: (rho, measured_qubits) with rho the final density
+        matrix as a tensor with one row axis and one column axis per qubit
+        """
+        measured = sorted(int(q) for q in circuit.qubits)
+        index = {q: i for i, q in enumerate(measured)}
+        n = len(measured)
+        rho = np.zeros((2,) * (2 * n), dtype=complex)
+        rho[(0,) * (2 * n)] = 1.0
+
+        for gate, channels, qubits in self.fused_groups(circuit):
+            k = len(qubits)
+            S = self.superoperator(gate, channels, k)
+            rows = [index[q] for q in qubits]
+            cols = [n + r for r in rows]
+            rho = np.tensordot(S, rho, axes=(list(range(2 * k, 4 * k)), rows + cols))
+            rho = np.moveaxis(rho, list(range(2 * k)), rows + cols)
+        return rho, measured
+
+    def probabilities(self, circuit):
+        rho, measured = self.density_matrix(circuit)
+        dim = 2 ** len(measured)
+        probs = np.real(np.diagonal(rho.reshape(dim, dim))).copy()
+        probs = np.clip(probs, 0.0, None)
+        return probs / probs.sum(), measured
+
+    def run(self, circuit, shots=0):
+        probs, measured = self.probabilities(circuit)
+        counts = Counter()
+        if shots:
+            n = len(measured)
+            for state, cnt in enumerate(self.rng.multinomial(shots, probs)):
+                if cnt:
+                    counts[format(state, f"0{n}b")] = int(cnt)
+        return dm_result(probs, measured, counts)
+
+    def run_batch(self, circuits, shots=0, max_parallel=None):
+        return dm_batch([self.run(c, shots) for c in circuits])
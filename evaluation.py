@@ -0,0 +1,120 @@
+"""
+Exact output distributions and the fidelity metrics used to compare the
+noiseless, noisy and compiled runs of a circuit.
+
+Each circuit is simulated once with a probability result type (shots=0),
+so the metrics are computed on exact probability vectors instead of on
+sampled counts, and are deterministic.
+"""
+from contextlib import nullcontext
+
+from braket.circuits import Circuit
+import numpy as np
+
+
+def exact_probabilities(circuit, device):
+    """
+    Return value: (probabilities, measured_qubits) where probabilities[i]
+    is the exact probability of basis state i over measured_qubits, first
+    qubit most significant. device is a LocalSimulator('braket_dm') or a
+    density_matrix_simulator.
+    """
+    if hasattr(device, "probabilities"):
+        probs, measured = device.probabilities(circuit)
+        return np.asarray(probs, dtype=float), list(measured)
+    measured = sorted(int(q) for q in circuit.qubits)
+    c = Circuit().add_circuit(circuit)
+    c.probability(target=measured)
+    result = device.run(c, shots=0).result()
+    probs = np.asarray(result.values[0], dtype=float)
+    return probs, measured
+
+
+def _is_mapped(vertex_map, q):
+    # vertex maps are dicts or sequences indexed by logical qubit
+    if isinstance(vertex_map, dict):
+        return q in vertex_map
+    return q < len(vertex_map)
+
+
+def to_logical(probs, measured, vertex_map, logical_qubits):
+    """
+    Reorders the distribution of a compiled circuit, measured on physical
+    qubits, into the order of logical_qubits. vertex_map maps logical ->
+    physical, as returned by the placement passes. Physical qubits that
+    carry no logical qubit are summed out, and logical qubits the compiled
+    circuit no longer touches (every gate on them cancelled) are in |0>.
+    """
+    n = len(measured)
+    tensor = np.asarray(probs).reshape((2,) * n)
+    position = {q: i for i, q in enumerate(measured)}
+    # axis of each logical qubit in tensor, None if it is not measured
+    # (qubits cancelled away entirely can also be missing from vertex_map)
+    axes = [
+        position.get(int(vertex_map[q])) if _is_mapped(vertex_map, q) else None
+        for q in logical_qubits
+    ]
+    idle = tuple(i for i in range(n) if i not in axes)
+    if idle:
+        tensor = tensor.sum(axis=idle)
+    kept = sorted(a for a in axes if a is not None)
+    order = []
+    for a in axes:
+        if a is None:
+            # unmeasured logical qubit, in |0> with certainty
+            tensor = np.stack([tensor, np.zeros_like(tensor)], axis=-1)
+            order.append(tensor.ndim - 1)
+        else:
+            order.append(kept.index(a))
+    return np.transpose(tensor, order).reshape(-1)
+
+
+def hellinger_distance(p, q):
+    return float(np.sqrt(max(0.0, 1.0 - np.sum(np.sqrt(p * q)))))
+
+
+def total_variation(p, q):
+    return float(0.5 * np.abs(p - q).sum())
+
+
+def normalized_overlap(p, q):
+    return float(p @ q / np.sqrt((p @ p) * (q @ q)))
+
+
+def fidelity_metrics(p, q):
+    """
+    Every metric comparing the distribution q against the reference p
+    """
+    p = np.asarray(p, dtype=float)
+    q = np.asarray(q, dtype=float)
+    return {
+        "hellinger": hellinger_distance(p, q),
+        "total_variation": total_variation(p, q),
+        "normalized_overlap": normalized_overlap(p, q),
+    }
+
+
+def compare_exact(circuit, compiled_circuit, vertex_map, noise_model, device, profile=None):
+    """
+    Simulates circuit without noise, and circuit and compiled_circuit under
+    noise_model, once each, and compares both noisy distributions to the
+    noiseless one.
+    device must be noiseless: noise_model is applied here, so a device
+    with its own noise model (a density_matrix_simulator given one) would
+    make the reference noisy and add the noise twice. With a run_profile,
+    applying the noise model is timed as the "apply_noise" stage.
+    Return value: {"noisy": metrics, "compiled": metrics}
+    """
+    if getattr(device, "noise_model", None) is not None:
+        raise ValueError("compare_exact needs a device without a noise model")
+    with profile.stage("apply_noise") if profile is not None else nullcontext():
+        noisy_circuit = noise_model.apply(circuit)
+        noisy_compiled = noise_model.apply(compiled_circuit)
+    ideal, logical = exact_probabilities(circuit, device)
+    noisy, _ = exact_probabilities(noisy_circuit, device)
+    compiled, physical = exact_probabilities(noisy_compiled, device)
+    compiled = to_logical(compiled, physical, vertex_map, logical)
+    return {
+        "noisy": fidelity_metrics(ideal, noisy),
+        "compiled": fidelity_metrics(ideal, compiled),
+    }
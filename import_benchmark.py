@@ -0,0 +1,55 @@
+# Measures the import time of the compile/placement core in a fresh
+# interpreter for each module, and fails if importing it loads the Braket
+# SDK or SciPy, which the core only loads on first use.
+
+import json
+import subprocess
+import sys
+
+
+# Modules that must import with only NumPy
+CORE_MODULES = [
+    "compilers.demand",
+    "compilers.placement",
+    "compilers.vertex_reindex",
+    "compilers.gate_cancellation",
+    "compilers.routing",
+    "compilers.ibm_compile",
+]
+HEAVY_PACKAGES = ["braket", "scipy"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def import_cost(module):
+    """
+    Return value: {"seconds": import time, "heavy": heavy packages loaded}
+    """
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    failed = False
+    for module in CORE_MODULES:
+        cost = import_cost(module)
+        status = "ok"
+        if cost["heavy"]:
+            status = "loads " + ", ".join(cost["heavy"])
+            failed = True
+        print(f"{module:>30}: {cost['seconds'] * 1e3:7.1f} ms  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Per-stage timers and counters for the calibrate -> compile -> simulate
+pipeline, with optional cProfile and tracemalloc capture, reported as one
+JSON document per run.
+"""
+from contextlib import contextmanager
+import cProfile
+import functools
+import json
+import pstats
+import time
+import tracemalloc
+
+
+class run_profile:
+    """
+    stages[name] holds the number of calls and total seconds of each timed
+    stage, counters[name] every counted quantity. With cprofile or memory
+    set, start() also starts cProfile or tracemalloc and the report gets the
+    top functions by cumulative time or the peak traced memory.
+    """
+
+    def __init__(self, cprofile=False, memory=False):
+        self.stages = {}
+        self.counters = {}
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.memory = memory
+        self._started = None
+        self._elapsed = 0.0
+        self._peak_memory = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.memory:
+            tracemalloc.start()
+        if self.cprofile is not None:
+            self.cprofile.enable()
+        return self
+
+    def stop(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if self.memory:
+            self._peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self._elapsed += time.perf_counter() - self._started
+        self._started = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def add_time(self, name, seconds, calls=1):
+        stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+        stage["calls"] += calls
+        stage["seconds"] += seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, name=None):
+        """
+        Decorator timing every call of a function as the stage name
+        (the function's name by default)
+        """
+        def decorate(f):
+            stage_name = name or f.__name__
+
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return f(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def top_functions(self, limit=20):
+        stats = pstats.Stats(self.cprofile)
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "function": f"{filename}:{line}({function})",
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            })
+        rows.sort(key=lambda row: -row["cumtime"])
+        return rows[:limit]
+
+    def report(self):
+        report = {
+            "elapsed": self._elapsed,
+            "stages": self.stages,
+            "counters": self.counters,
+        }
+        if self._peak_memory is not None:
+            report["peak_memory"] = self._peak_memory
+        if self.cprofile is not None:
+            report["top_functions"] = self.top_functions()
+        return report
+
+    def summary(self):
+        """
+        The stage timers and counters as text, one line each, stages
+        slowest first
+        """
+        lines = []
+        for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{name:>20}: {stage['seconds'] * 1e3:9.2f} ms in {stage['calls']} calls")
+        for name, value in self.counters.items():
+            lines.append(f"{name:>20}: {value}")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class counting_device:
+    """
+    Wraps a device so every run and run_batch is timed as the "simulate"
+    stage and counted in simulator_calls and shots.
+    """
+
+    def __init__(self, device, profile):
+        self.device = device
+        self.profile = profile
+        self.name = getattr(device, "name", type(device).__name__)
+
+    def run(self, circuit, shots=0, **kwargs):
+        self.profile.count("simulator_calls")
+        self.profile.count("shots", shots)
+        with self.profile.stage("simulate"):
+            task = self.device.run(circuit, shots=shots, **kwargs)
+            # local results are computed here, so time them with the run
+            task.result()
+        return task
+
+    def run_batch(self, circuits, shots=0, **kwargs):
+        circuits = list(circuits)
+        self.profile.count("simulator_calls", len(circuits))
+        self.profile.count("shots", shots * len(circuits))
+        with self.profile.stage("simulate"):
+            batch = self.device.run_batch(circuits, shots=shots, **kwargs)
+            batch.results()
+        return batch
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
@@ -0,0 +1,119 @@
+"""
+Closed form expectation values for the calibration circuits.
+
+The calibration circuits are Clifford (H, CNOT, I) and every channel the
+noise model attaches to them is a Pauli channel, so a Z-type observable
+can be propagated backwards through the noisy circuit one instruction at
+a time: gates conjugate it, and each noise channel multiplies the result
+by its eigenvalue on the current Pauli. No state is ever simulated.
+"""
+from braket.circuits.noise import Noise
+import numpy as np
+
+
+def _conjugate_gate(name, targets, x, z, sign):
+    """
+    Conjugates the Pauli (x, z, sign) by a Clifford gate in place, using
+    the Aaronson-Gottesman update rules. Returns the new sign.
+    """
+    if name == "I":
+        return sign
+    if name == "H":
+        q = targets[0]
+        sign ^= x[q] & z[q]
+        x[q], z[q] = z[q], x[q]
+        return sign
+    if name == "X":
+        return sign ^ z[targets[0]]
+    if name == "Z":
+        return sign ^ x[targets[0]]
+    if name == "Y":
+        return sign ^ x[targets[0]] ^ z[targets[0]]
+    if name in ("S", "Si"):
+        # S and Si differ from each other by Z, which only flips the sign
+        q = targets[0]
+        sign ^= x[q] & z[q]
+        if name == "Si":
+            sign ^= x[q]
+        z[q] ^= x[q]
+        return sign
+    if name == "CNot":
+        c, t = targets
+        sign ^= x[c] & z[t] & (x[t] ^ z[c] ^ 1)
+        x[t] ^= x[c]
+        z[c] ^= z[t]
+        return sign
+    if name == "CZ":
+        c, t = targets
+        sign ^= x[c] & x[t] & (z[c] ^ z[t])
+        z[c] ^= x[t]
+        z[t] ^= x[c]
+        return sign
+    if name == "Swap":
+        a, b = targets
+        x[a], x[b] = x[b], x[a]
+        z[a], z[b] = z[b], z[a]
+        return sign
+    raise ValueError(f"No analytic rule for gate {name}")
+
+
+def _noise_eigenvalue(noise, targets, x, z):
+    """
+    Eigenvalue of a Pauli noise channel on the Pauli (x, z), which is the
+    factor the channel applies to its expectation value.
+    """
+    name = noise.name
+    active = [q for q in targets if x[q] or z[q]]
+    if name == "BitFlip":
+        return 1 - 2 * noise.probability if z[targets[0]] else 1.0
+    if name == "PhaseFlip":
+        return 1 - 2 * noise.probability if x[targets[0]] else 1.0
+    if name == "PauliChannel":
+        q = targets[0]
+        flip = 0.0
+        if z[q]:
+            flip += noise.probX + noise.probY
+        if x[q]:
+            flip += noise.probZ + noise.probY
+        if x[q] and z[q]:
+            flip -= 2 * noise.probY
+        return 1 - 2 * flip
+    if name == "Depolarizing":
+        return 1 - 4 * noise.probability / 3 if active else 1.0
+    if name == "TwoQubitDepolarizing":
+        return 1 - 16 * noise.probability / 15 if active else 1.0
+    if name == "TwoQubitDephasing":
+        # ZI, IZ and ZZ each with probability p/3: a Pauli with X support on
+        # exactly one qubit anticommutes with two of them, on both with ZI, IZ
+        flips = sum(x[q] for q in targets)
+        if flips == 0:
+            return 1.0
+        return 1 - 4 * noise.probability / 3
+    raise ValueError(f"No analytic rule for noise {name}")
+
+
+def z_expectation(circuit, qubits, n):
+    """
+    Exact expectation of the product of Z on qubits for the noisy circuit
+    run on |0...0>.
+    """
+    x = np.zeros(n, dtype=np.uint8)
+    z = np.zeros(n, dtype=np.uint8)
+    z[list(qubits)] = 1
+    sign = 0
+    factor = 1.0
+
+    for instruction in reversed(circuit.instructions):
+        targets = [int(q) for q in instruction.target]
+        operator = instruction.operator
+        if isinstance(operator, Noise):
+            factor *= _noise_eigenvalue(operator, targets, x, z)
+        else:
+            # Backwards propagation conjugates by U^dagger. Every supported
+            # gate is self-inverse except S and Si, which invert each other.
+            name = {"S": "Si", "Si": "S"}.get(operator.name, operator.name)
+            sign = _conjugate_gate(name, targets, x, z, sign)
+
+    if x.any():
+        return 0.0
+    return -factor if sign else factor
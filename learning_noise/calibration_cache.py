@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "noise_calibration")
+
+
+# Criteria.to_dict() fields that hold sets, listed in set iteration order
+CRITERIA_SET_FIELDS = ("gates", "qubits")
+
+
+def _canonical(value):
+    """
+    Turns a to_dict() payload into something json can dump in a stable order.
+    Sets are sorted; lists and tuples keep their order, which can matter
+    (Kraus matrices, the control and target of a qubit pair).
+    """
+    if isinstance(value, dict):
+        return {
+            str(key): _canonical(item)
+            for key, item in value.items()
+            if key != "ascii_symbols"
+        }
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(item) for item in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, float):
+        return repr(value)
+    return value
+
+
+def _canonical_criteria(criteria):
+    payload = _canonical(criteria.to_dict())
+    for field in CRITERIA_SET_FIELDS:
+        if isinstance(payload.get(field), list):
+            payload[field] = sorted(payload[field], key=repr)
+    return payload
+
+
+def noise_model_fingerprint(noise_model):
+    """
+    Hash of every (noise, criteria) instruction in the noise model,
+    including the noise probabilities.
+    """
+    instructions = [
+        [_canonical(inst.noise.to_dict()), _canonical_criteria(inst.criteria)]
+        for inst in noise_model.instructions
+    ]
+    payload = json.dumps(instructions, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def calibration_fingerprint(classifier):
+    """
+    Cache key for a fidelity_classifier: the noise model, the qubit count,
+    the shot count and the device name.
+    """
+    key = {
+        "noise_model": noise_model_fingerprint(classifier.noise_model),
+        "n": classifier.n,
+        "shotnum": classifier.shotnum,
+        "device": getattr(classifier.device, "name", type(classifier.device).__name__),
+    }
+    payload = json.dumps(key, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class calibration_cache:
+    """
+    On-disk store of fidelity_classifier results. Each calibration is one
+    .npz file holding the single qubit fidelity vector, the two qubit
+    fidelity matrix and the time it was written.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key):
+        """
+        Return value: (single_qubit_fidelity, two_qubit_fidelity) for key,
+        or None if there is no entry or it is older than the ttl in seconds
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            created = float(data["created"])
+            if self.ttl is not None and time.time() - created > self.ttl:
+                return None
+            return data["single"].tolist(), data["two"].copy()
+
+    def save(self, key, single_fidelity, two_fidelity):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write next to the target and rename so readers never see half a file
+        tmp_path = self.path(key) + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            single=np.asarray(single_fidelity, dtype=np.float64),
+            two=np.asarray(two_fidelity, dtype=np.float64),
+            created=np.float64(time.time()),
+        )
+        os.replace(tmp_path, self.path(key))
+
+    def invalidate(self, key):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def fidelities(self, classifier, refresh=False, **kwargs):
+        """
+        Returns the classifier's (single_qubit_fidelity, two_qubit_fidelity),
+        calibrating and storing them on a miss. refresh=True ignores any
+        stored entry. Extra keyword arguments go to two_qubit_fidelity.
+        """
+        key = calibration_fingerprint(classifier)
+        if not refresh:
+            cached = self.load(key)
+            if cached is not None:
+                return cached
+
+        single_fidelity = classifier.single_qubit_fidelity()
+        two_fidelity = classifier.two_qubit_fidelity(**kwargs)
+        self.save(key, single_fidelity, two_fidelity)
+        return single_fidelity, two_fidelity
@@ -13,19 +13,79 @@ from braket.devices import LocalSimulator
 import numpy as np
 import math
 
+from analytic_fidelity import z_expectation
+from noise_index import noise_index
+
+
+class counts_array:
+    """
+    NumPy-backed view of a measurement_counts dictionary.
+    states and counts are parallel integer arrays, where bit q of states[k]
+    is the value measured on qubit q. bits is the states x qubits 0/1 matrix,
+    unpacked once so every marginal below is a single matrix operation.
+    """
+
+    def __init__(self, measurement_counts, n):
+        self.n = n
+        self.states = np.fromiter(
+            (int(state[::-1], 2) for state in measurement_counts),
+            dtype=np.int64,
+            count=len(measurement_counts),
+        )
+        self.counts = np.fromiter(
+            measurement_counts.values(), dtype=np.int64, count=len(measurement_counts)
+        )
+        self.shots = int(self.counts.sum())
+        self.bits = (self.states[:, None] >> np.arange(n)) & 1
+
+    def zero_marginals(self):
+        """
+        Return value: array of length n where index i is the probability
+        of measuring qubit i in |0>
+        """
+        return self.counts @ (1 - self.bits) / self.shots
+
+    def agreement(self):
+        """
+        Return value: nxn array where the value at index i,j is the
+        probability that qubits i and j were measured with equal values
+        """
+        ones = self.bits * self.counts[:, None]
+        zeros = (1 - self.bits) * self.counts[:, None]
+        return (ones.T @ self.bits + zeros.T @ (1 - self.bits)) / self.shots
+
+    def parity(self):
+        """
+        Return value: nxn array where the value at index i,j is the
+        probability that qubits i and j were measured with different values
+        """
+        return 1 - self.agreement()
+
+
+def standard_error(successes, shots):
+    """
+    Standard error of the binomial proportion successes / shots. Uses the
+    add-one estimate of p so a run with no failures yet does not report
+    zero error.
+    """
+    p = (successes + 1) / (shots + 2)
+    return np.sqrt(p * (1 - p) / shots)
+
 
 class fidelity_classifier:
-    def __init__(self, n, device, noise_model):
+    def __init__(self, n, device, noise_model, shotnum=10000):
         self.n = n
         self.device = device
         self.noise_model = noise_model
+        self.noise_index = noise_index(noise_model)
+        self.shotnum = shotnum
 
     def create_hadamard_circuit(self, gate_num=2):
         c = Circuit()
         for qubit in range(self.n):
             for _ in range(gate_num):
                 c.h(qubit)
-        c = self.noise_model.apply(c)
+        c = self.noise_index.apply(c)
         return c
 
     def single_qubit_fidelity(self, had_cnt=2):
@@ -36,23 +96,11 @@ class fidelity_classifier:
         the estimated fidelity of the i'th qubit
         """
         c = self.create_hadamard_circuit(had_cnt)
-        shotnum = 10000
+        shotnum = self.shotnum
         task = self.device.run(c, shots=shotnum)
         result = task.result()
-        measurement = result.measurement_counts
-        measurement = {int(state[::-1], 2): cnt for state, cnt in measurement.items()}
-        return [
-            (
-                sum(
-                    cnt
-                    for state, cnt in measurement.items()
-                    if not (state & (2**qubit))
-                )
-                / shotnum
-            )
-            ** 0.5
-            for qubit in range(self.n)
-        ]
+        measurement = counts_array(result.measurement_counts, self.n)
+        return (measurement.zero_marginals() ** 0.5).tolist()
 
     def create_round_robin(self):
         """
@@ -95,43 +143,144 @@ class fidelity_classifier:
 
         return table
 
-    def two_qubit_fidelity(self):
+    def create_round_circuit(self, round):
+        """
+        Builds the noisy circuit for one round of the round-robin table:
+        a Hadamard on the control and a CNOT control -> target for every
+        game, and an identity on the qubit sitting the round out.
+        """
+        c = Circuit()
+        for a, b in round:
+            if a == b:
+                c.i(a)
+                continue
+            c.h(a)
+            c.cnot(a, b)
+        return self.noise_index.apply(c)
+
+    def run_rounds(self, circuits, shotnum, max_parallel=None):
+        """
+        Runs every round circuit and returns their measurement_counts in
+        the same order. With max_parallel set, all rounds are submitted at
+        once through the device's batch API, which runs up to max_parallel
+        of them concurrently (a process pool on the LocalSimulator).
+        """
+        if max_parallel is None:
+            return [
+                self.device.run(c, shots=shotnum).result().measurement_counts
+                for c in circuits
+            ]
+        batch = self.device.run_batch(circuits, shots=shotnum, max_parallel=max_parallel)
+        return [result.measurement_counts for result in batch.results()]
+
+    def two_qubit_fidelity(self, max_parallel=None):
         """
         Measures the fidelity of gates between every pair of two qubits
         It does this in 2*n operations where n is the number of quantum
-        gates.
+        gates. Pass max_parallel to run the rounds concurrently with up
+        to that many workers.
         Return value: nxn array where the value at the index i,j represents
         the fidelity of a CNOT gate from i -> j
         """
         two_q_fidelity = np.zeros((self.n, self.n))
         table = self.create_round_robin()
-        for round in table:
-            c = Circuit()
-            for a, b in round:
-                if a == b:
-                    c.i(a)
-                    continue
-                c.h(a)
-                c.cnot(a, b)
-            c = self.noise_model.apply(c)
-
-            shotnum = 10000
-            task = self.device.run(c, shots=shotnum)
-            result = task.result()
-            measurement = result.measurement_counts
-            measurement = {
-                int(state[::-1], 2): cnt for state, cnt in measurement.items()
-            }
+        circuits = [self.create_round_circuit(round) for round in table]
+
+        shotnum = self.shotnum
+        all_counts = self.run_rounds(circuits, shotnum, max_parallel)
 
+        for round, counts in zip(table, all_counts):
+            measurement = counts_array(counts, self.n)
+
+            pairs = np.array([(a, b) for a, b in round if a != b]).reshape(-1, 2)
+            agreement = measurement.agreement()
+            two_q_fidelity[pairs[:, 0], pairs[:, 1]] = agreement[pairs[:, 0], pairs[:, 1]]
+
+        return two_q_fidelity
+
+    def analytic_single_qubit_fidelity(self, had_cnt=2):
+        """
+        Exact expectation of single_qubit_fidelity, computed from the noise
+        model instead of sampled. Same return value as single_qubit_fidelity.
+        """
+        c = self.create_hadamard_circuit(had_cnt)
+        return [
+            ((1 + z_expectation(c, [qubit], self.n)) / 2) ** 0.5
+            for qubit in range(self.n)
+        ]
+
+    def analytic_two_qubit_fidelity(self):
+        """
+        Exact expectation of two_qubit_fidelity, computed from the noise
+        model instead of sampled. Same return value as two_qubit_fidelity.
+        """
+        two_q_fidelity = np.zeros((self.n, self.n))
+        for round in self.create_round_robin():
+            c = self.create_round_circuit(round)
             for a, b in round:
                 if a == b:
                     continue
-                cur_cnt = 0
-                for state, cnt in measurement.items():
-                    if state & (1 << a) and state & (1 << b):
-                        cur_cnt += cnt
-                    if (not state & (1 << a)) and (not state & (1 << b)):
-                        cur_cnt += cnt
-                two_q_fidelity[a][b] = cur_cnt / shotnum
+                two_q_fidelity[a][b] = (1 + z_expectation(c, [a, b], self.n)) / 2
+        return two_q_fidelity
 
+    def adaptive_single_qubit_fidelity(self, had_cnt=2, target_se=0.002, batch=500):
+        """
+        single_qubit_fidelity, but run batch shots at a time until the
+        standard error of every qubit's fidelity is at most target_se, or
+        self.shotnum shots have been used.
+        Return Value: Array of length n where index i contains
+        the estimated fidelity of the i'th qubit
+        """
+        c = self.create_hadamard_circuit(had_cnt)
+        zeros = np.zeros(self.n)
+        shots = 0
+        while shots < self.shotnum:
+            cur = min(batch, self.shotnum - shots)
+            result = self.device.run(c, shots=cur).result()
+            measurement = counts_array(result.measurement_counts, self.n)
+            zeros += measurement.zero_marginals() * cur
+            shots += cur
+            # fidelity is sqrt(p), so its error is se(p) / (2 sqrt(p))
+            p = zeros / shots
+            if (standard_error(zeros, shots) / (2 * np.sqrt(p))).max() <= target_se:
+                break
+        self.shots_used = shots
+        return np.sqrt(zeros / shots).tolist()
+
+    def adaptive_two_qubit_fidelity(self, target_se=0.005, batch=500, max_parallel=None):
+        """
+        two_qubit_fidelity, but run batch shots at a time and only rerun
+        the rounds that still have a pair whose standard error is above
+        target_se. A round stops after self.shotnum shots regardless.
+        Return value: nxn array where the value at the index i,j represents
+        the fidelity of a CNOT gate from i -> j
+        """
+        table = self.create_round_robin()
+        circuits = [self.create_round_circuit(round) for round in table]
+        pairs = [np.array([(a, b) for a, b in round if a != b]).reshape(-1, 2) for round in table]
+        agree = [np.zeros(len(p)) for p in pairs]
+        shots = np.zeros(len(table), dtype=np.int64)
+
+        pending = list(range(len(table)))
+        while pending:
+            cur = {i: min(batch, self.shotnum - shots[i]) for i in pending}
+            # run_rounds takes one shot count, so group rounds by it
+            for shotnum in set(cur.values()):
+                group = [i for i in pending if cur[i] == shotnum]
+                all_counts = self.run_rounds([circuits[i] for i in group], shotnum, max_parallel)
+                for i, counts in zip(group, all_counts):
+                    agreement = counts_array(counts, self.n).agreement()
+                    agree[i] += agreement[pairs[i][:, 0], pairs[i][:, 1]] * shotnum
+                    shots[i] += shotnum
+            pending = [
+                i
+                for i in pending
+                if shots[i] < self.shotnum
+                and standard_error(agree[i], shots[i]).max() > target_se
+            ]
+
+        two_q_fidelity = np.zeros((self.n, self.n))
+        for i in range(len(table)):
+            two_q_fidelity[pairs[i][:, 0], pairs[i][:, 1]] = agree[i] / shots[i]
+        self.shots_used = int(shots.sum())
         return two_q_fidelity
@@ -4,37 +4,58 @@
 # - Feed the information about noise and the intended circuit to the compiler
 # - Run the compiled circuits on the noisy simulator
 
+import argparse
+
 from circuits.qft import qft
 from braket.devices import LocalSimulator
 
 from simulating_noise import noise_model
 from fidelity_measurement import fidelity_classifier
+from calibration_cache import calibration_cache
+from compilers.batch_compile import calibration_tables, compile_circuit
+from evaluation import compare_exact
+from instrumentation import counting_device, run_profile
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", help="write a JSON profile of the run (cProfile and memory) to this path")
+    args = parser.parse_args()
+
+    # stage timers are always on and printed at the end; cProfile and
+    # tracemalloc only run when asked for
+    profiling = args.profile is not None
+    profile = run_profile(cprofile=profiling, memory=profiling).start()
+
     # Set up quantum computer
-    device = LocalSimulator('braket_dm')
-    nm = noise_model()
+    device = counting_device(LocalSimulator('braket_dm'), profile)
+    with profile.stage("noise_model"):
+        nm = noise_model()
 
     # Generate test circuit
-    test_circuit = qft(3)
-    test_circuit_no_noise = qft(3)
+    test_circuit = qft(3, [])
 
     # Classify noise
     device_fidelity = fidelity_classifier(11, device, nm)
 
-    single_qubit_fidelity = device_fidelity.single_qubit_fidelity()
-    two_qubit_fidelity = device.two_qubit_fidelity()
+    with profile.stage("calibrate"):
+        single_qubit_fidelity, two_qubit_fidelity = calibration_cache().fidelities(device_fidelity)
     
     # Compile circuit with noise input
-    compiled_circuit = compile(test_circuit, fidelities)
-
-    # apply the noise model to the circuit
-    test_circuit = nm.apply(test_circuit)
-    compiled_circuit = nm.apply(compiled_circuit)
-
-    # Run the circuits 
-    test_result = device.run(test_circuit, shots=1000).result()
-    no_noise_result = device.run(test_circuit_no_noise, shots=1000).result()
-    compiled_result = device.run(compiled_circuit, shots=1000).result()
-    
-    
\ No newline at end of file
+    tables = calibration_tables(single_qubit_fidelity, two_qubit_fidelity)
+    compiled_circuit, vertex_map, timings = compile_circuit(test_circuit, tables)
+    for stage in ("cancel", "placement", "rewrite"):
+        profile.add_time(f"compile.{stage}", timings[stage])
+    profile.count("instructions_in", len(test_circuit.instructions))
+    profile.count("instructions_out", len(compiled_circuit.instructions))
+    # placement and relabelling keep every gate, so the difference is cancellation
+    profile.count("gates_cancelled", len(test_circuit.instructions) - len(compiled_circuit.instructions))
+
+    # Simulate each circuit once and compare the exact output distributions
+    with profile.stage("evaluate"):
+        metrics = compare_exact(test_circuit, compiled_circuit, vertex_map, nm, device, profile)
+    print(metrics)
+
+    profile.stop()
+    print(profile.summary())
+    if profiling:
+        profile.write_json(args.profile)
@@ -11,39 +11,100 @@ from braket.circuits.noises import (
 )
 from braket.devices import LocalSimulator
 import numpy as np
-import math
-
-def noise_model():
-    rng = np.random.default_rng()
-    m = NoiseModel()
-    
-    two_q_depo_mu = 1 - 0.9311
-    two_q_depo_sigma = 0.005
-    bf_mu = 1 - 0.99752
-    bf_sigma = 0.0015
-    one_q_depo_mu = 1 - 0.9981
-    one_q_depo_sigma = 0.00017
-    for qi in range(11):
-        z_bf_prob = bf_mu + bf_sigma * rng.standard_normal()
-        z_bf_prob = 0.0 if z_bf_prob < 0.0 else z_bf_prob
-        
-        bf_prob = bf_mu + bf_sigma * rng.standard_normal()
-        bf_prob = 0.0 if bf_prob < 0.0 else bf_prob
-        
-        one_q_depo_prob = one_q_depo_mu + one_q_depo_sigma * rng.standard_normal()
-        one_q_depo_prob = 0.0 if one_q_depo_prob < 0.0 else one_q_depo_prob
-        
-        m.add_noise(BitFlip(z_bf_prob), ObservableCriteria(observables=Observable.Z, qubits=qi))
-        #m.add_noise(BitFlip(bf_prob), ObservableCriteria(qubits=qi))
-        
-        m.add_noise(Depolarizing(one_q_depo_prob), GateCriteria(qubits=qi))
-        for qj in range(11):
-            if not qj == qi:
-                two_q_depo_prob = two_q_depo_mu + two_q_depo_sigma * rng.standard_normal()
-                two_q_depo_prob = 0.0 if two_q_depo_prob < 0.0 else two_q_depo_prob
-                
-                m.add_noise(TwoQubitDepolarizing(two_q_depo_prob), GateCriteria(gates=[Gate.CNot, Gate.Swap, Gate.CPhaseShift], qubits=[qi, qj]))
-    return m
+
+TWO_Q_DEPO_MU = 1 - 0.9311
+TWO_Q_DEPO_SIGMA = 0.005
+BF_MU = 1 - 0.99752
+BF_SIGMA = 0.0015
+ONE_Q_DEPO_MU = 1 - 0.9981
+ONE_Q_DEPO_SIGMA = 0.00017
+
+
+class noise_parameters:
+    """
+    The probabilities behind a noise model: readout_flip[i] is the Z
+    readout bit flip probability of qubit i, depolarizing[i] the single
+    qubit depolarizing probability after each gate on i, and
+    two_qubit_depolarizing[i, j] the two qubit depolarizing probability
+    after a CNot, Swap or CPhaseShift on (i, j). Saved as one small .npz.
+    """
+
+    def __init__(self, readout_flip, depolarizing, two_qubit_depolarizing):
+        self.readout_flip = np.asarray(readout_flip, dtype=np.float64)
+        self.depolarizing = np.asarray(depolarizing, dtype=np.float64)
+        self.two_qubit_depolarizing = np.asarray(two_qubit_depolarizing, dtype=np.float64)
+        self.num_qubits = len(self.depolarizing)
+
+    @classmethod
+    def sample(cls, num_qubits=11, seed=None):
+        """
+        Draws every probability in one vectorized normal draw, clipped at 0
+        """
+        rng = np.random.default_rng(seed)
+        mu = np.array([BF_MU, ONE_Q_DEPO_MU])[:, None]
+        sigma = np.array([BF_SIGMA, ONE_Q_DEPO_SIGMA])[:, None]
+        readout_flip, depolarizing = np.clip(
+            mu + sigma * rng.standard_normal((2, num_qubits)), 0.0, None
+        )
+        two_qubit_depolarizing = np.clip(
+            TWO_Q_DEPO_MU + TWO_Q_DEPO_SIGMA * rng.standard_normal((num_qubits, num_qubits)),
+            0.0, None,
+        )
+        np.fill_diagonal(two_qubit_depolarizing, 0.0)
+        return cls(readout_flip, depolarizing, two_qubit_depolarizing)
+
+    def _classifier(self):
+        # fidelity_measurement lives in learning_noise and needs the noise
+        # model, so it is only loaded for the ground truth
+        from fidelity_measurement import fidelity_classifier
+
+        return fidelity_classifier(self.num_qubits, None, self.to_noise_model())
+
+    def single_qubit_fidelity(self):
+        """
+        Ground truth for the calibration: the exact expectation of
+        fidelity_classifier.single_qubit_fidelity under this noise model,
+        which is not 1 - depolarizing probability
+        """
+        return np.asarray(self._classifier().analytic_single_qubit_fidelity())
+
+    def two_qubit_fidelity(self):
+        """
+        Ground truth for the calibration: the exact expectation of
+        fidelity_classifier.two_qubit_fidelity under this noise model, an
+        nxn array with 0 on the diagonal
+        """
+        return self._classifier().analytic_two_qubit_fidelity()
+
+    def to_noise_model(self):
+        m = NoiseModel()
+        for qi in range(self.num_qubits):
+            m.add_noise(BitFlip(float(self.readout_flip[qi])), ObservableCriteria(observables=Observable.Z, qubits=qi))
+            m.add_noise(Depolarizing(float(self.depolarizing[qi])), GateCriteria(qubits=qi))
+            for qj in range(self.num_qubits):
+                if qj != qi:
+                    m.add_noise(
+                        TwoQubitDepolarizing(float(self.two_qubit_depolarizing[qi, qj])),
+                        GateCriteria(gates=[Gate.CNot, Gate.Swap, Gate.CPhaseShift], qubits=[qi, qj]),
+                    )
+        return m
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            readout_flip=self.readout_flip,
+            depolarizing=self.depolarizing,
+            two_qubit_depolarizing=self.two_qubit_depolarizing,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["readout_flip"], data["depolarizing"], data["two_qubit_depolarizing"])
+
+
+def noise_model(seed=None, num_qubits=11):
+    return noise_parameters.sample(num_qubits, seed).to_noise_model()
 
 def main():
     # build my circuit here